@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Allow running as `python benchmarks/run_benchmarks.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from benchmarks.synthetic import generate_schedules, fake_pitcher_stat
+from features.compact import CompactFeatures
+from features.team_features import load_schedule, build_features
+from models.train_model import training_data, train
+from scripts.predictor import predict_games
+from scripts.simulation import season_arrays, simulate_aggregate
+from utils.divisions import DIVISIONS, WILD_CARDS, team_division, division_league
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def measure(stage, rows, fn, *args, **kwargs):
+    """
+    Run fn and return (result, stats) with wall and CPU seconds, rows per
+    second and peak traced memory. Timing comes from a plain run; memory
+    from a second run under tracemalloc, which slows Python code down too
+    much to time it. tracemalloc sees Python and NumPy allocations but not
+    memory allocated inside xgboost's native code.
+    """
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = fn(*args, **kwargs)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = {
+        "rows": rows,
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "rows_per_s": round(rows / wall, 1) if wall > 0 else None,
+        "peak_mb": round(peak / 2**20, 2),
+    }
+    print(f"  {stage:20} {rows:>9} rows  {wall:8.3f} s  {stats['rows_per_s'] or 0:>12,.0f} rows/s  {stats['peak_mb']:8.1f} MB")
+    return result, stats
+
+
+def run_size(n_seasons, n_sims, tmp_dir):
+    print(f"\n{n_seasons} season(s):")
+    schedules = generate_schedules(n_seasons)
+    paths = []
+    for i, season in enumerate(schedules):
+        path = os.path.join(tmp_dir, f"asplayed-{n_seasons}-{i}.csv")
+        season.to_csv(path, index=False)
+        paths.append(path)
+
+    results = {}
+
+    def feature_stage():
+        return build_features(load_schedule(paths), pitcher_stat=fake_pitcher_stat)
+
+    n_games = sum(len(season) for season in schedules)
+    features_df, results["features"] = measure("feature engineering", n_games, feature_stage)
+
+    x, y = training_data(CompactFeatures.from_frame(features_df[features_df["target"] != -1], dtype=np.float64))
+    (scaler, model, _, _), results["train"] = measure("training", len(x), train, x, y)
+
+    games = CompactFeatures.from_frame(features_df, scaler)
+    records, results["predict"] = measure("batch prediction", len(games), predict_games, scaler, model, games)
+
+    # Simulate the rest of the final season (the only one with scheduled games)
+    last_season = games.between(f"{features_df['date'].dt.year.max()}-01-01")
+    scheduled = games.target == -1
+    upcoming = games.scheduled()
+    home_probs = np.array([record["home_win_prob"] for record in records])[scheduled].round(3)
+    teams, base_wins, home_idx, away_idx = season_arrays(last_season, upcoming)
+
+    division_names = list(DIVISIONS)
+    league_names = sorted({division_league(d) for d in division_names})
+    divisions = [team_division(team) for team in teams]
+    division_idx = np.array([division_names.index(d) if d else -1 for d in divisions])
+    league_idx = np.array([league_names.index(division_league(d)) if d else -1 for d in divisions])
+
+    _, results["simulate"] = measure(
+        "season simulation", n_sims * len(upcoming), simulate_aggregate,
+        base_wins, home_idx, away_idx, home_probs, division_idx, league_idx, WILD_CARDS, n_sims=n_sims, seed=0,
+    )
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """List (size, stage, metric, baseline, current) entries that got worse than tolerance allows."""
+    regressions = []
+    for size, stages in current.items():
+        for stage, stats in stages.items():
+            before = baseline.get(size, {}).get(stage)
+            if not before:
+                continue
+            for metric in ["wall_s", "peak_mb"]:
+                if before[metric] and stats[metric] > before[metric] * (1 + tolerance):
+                    regressions.append((size, stage, metric, before[metric], stats[metric]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic multi-season schedules")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="Numbers of seasons to benchmark")
+    parser.add_argument("--simulations", type=int, default=10000, help="Seasons simulated in the simulation stage")
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILE, help="Baseline JSON to compare against / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown or memory growth before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    current = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_seasons in args.sizes:
+            current[f"{n_seasons}_seasons"] = run_size(n_seasons, args.simulations, tmp_dir)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("\n\033[91mRegressions against baseline:\033[0m")
+            for size, stage, metric, before, after in regressions:
+                print(f"  {size} {stage} {metric}: {before} -> {after}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
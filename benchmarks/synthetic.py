@@ -0,0 +1,102 @@
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.divisions import DIVISIONS
+
+TEAMS = [team for teams in DIVISIONS.values() for team in teams]
+
+ASPLAYED_COLUMNS = [
+    "Date", "Start Time (Sask)", "Start Time (EDT)", "Away", "Away Score", "Home", "Home Score",
+    "Status", "Away Starter", "Home Starter", "Winner", "Loser", "Save",
+]
+
+GAMES_PER_TEAM = 162
+SEASON_DAYS = 186
+ROTATION = 5
+
+
+def generate_season(year, rng, scheduled_from=None):
+    """
+    One synthetic season in the data/mlb-2025-asplayed.csv schema: 2430 games
+    between the 30 clubs over ~six months, five-man rotations, Poisson run
+    scoring with a small home edge. Games on or after `scheduled_from`
+    (a fraction of the season, e.g. 0.9) are left Scheduled with no scores.
+    """
+    n_teams = len(TEAMS)
+    n_games = n_teams * GAMES_PER_TEAM // 2
+
+    # Random pairings, then spread evenly over the season's days
+    home = rng.integers(0, n_teams, n_games)
+    away = (home + rng.integers(1, n_teams, n_games)) % n_teams
+    day = np.sort(rng.integers(0, SEASON_DAYS, n_games))
+    opening_day = date(year, 3, 27)
+    dates = [opening_day + timedelta(days=int(d)) for d in day]
+
+    home_score = rng.poisson(4.6, n_games)
+    away_score = rng.poisson(4.4, n_games)
+    # No ties in baseball: extra innings go to a coin flip
+    tied = home_score == away_score
+    home_score[tied] += rng.integers(0, 2, tied.sum())
+    away_score[tied & (home_score == away_score)] += 1
+
+    # Rotations cycle through each team's games in order
+    starts = np.zeros(n_teams, dtype=int)
+    home_starter, away_starter = [], []
+    for h, a in zip(home, away):
+        home_starter.append(f"{TEAMS[h].split()[-1]} Starter {year}-{starts[h] % ROTATION + 1}")
+        away_starter.append(f"{TEAMS[a].split()[-1]} Starter {year}-{starts[a] % ROTATION + 1}")
+        starts[h] += 1
+        starts[a] += 1
+
+    season = pd.DataFrame({
+        "Date": [d.strftime("%Y-%m-%d") for d in dates],
+        "Start Time (Sask)": "5:10 PM",
+        "Start Time (EDT)": "7:10 PM",
+        "Away": [TEAMS[a] for a in away],
+        "Away Score": away_score.astype(float),
+        "Home": [TEAMS[h] for h in home],
+        "Home Score": home_score.astype(float),
+        "Status": "Final",
+        "Away Starter": away_starter,
+        "Home Starter": home_starter,
+    })
+    home_won = season["Home Score"] > season["Away Score"]
+    season["Winner"] = np.where(home_won, season["Home Starter"], season["Away Starter"])
+    season["Loser"] = np.where(home_won, season["Away Starter"], season["Home Starter"])
+    season["Save"] = ""
+
+    if scheduled_from is not None:
+        scheduled = day >= int(SEASON_DAYS * scheduled_from)
+        season.loc[scheduled, ["Away Score", "Home Score"]] = np.nan
+        season.loc[scheduled, ["Status", "Winner", "Loser"]] = ["Scheduled", "", ""]
+        # Starters are only announced a few days out
+        far_out = day >= int(SEASON_DAYS * scheduled_from) + 3
+        season.loc[far_out, ["Away Starter", "Home Starter"]] = np.nan
+
+    return season[ASPLAYED_COLUMNS]
+
+
+def generate_schedules(n_seasons, seed=0, last_year=2025, scheduled_from=0.9):
+    """
+    n_seasons of synthetic as-played schedules, oldest first. Only the last
+    season has scheduled games left to play.
+    """
+    rng = np.random.default_rng(seed)
+    first_year = last_year - n_seasons + 1
+    return [
+        generate_season(year, rng, scheduled_from if year == last_year else None)
+        for year in range(first_year, last_year + 1)
+    ]
+
+
+def fake_pitcher_stat(player_name, stat, season="2025"):
+    """Deterministic stand-in for get_pitcher_stat_cached that never touches the network."""
+    h = zlib.crc32(f"{player_name}|{season}".encode("utf-8"))
+    if stat == "era":
+        return 2.5 + (h % 300) / 100
+    if stat == "whip":
+        return 0.9 + (h // 300 % 70) / 100
+    return None
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from features.feature_store import CSV_FILE, STORE_FILE, read_features
+from utils.instrumentation import metrics
+
+# Columns of the feature table that are not model inputs
+NON_FEATURE_COLUMNS = ["home_team", "away_team", "home_starter", "away_starter", "target", "date", "home_score", "away_score"]
+# Name columns and the category list their codes index into
+NAME_COLUMNS = {"home_team": "teams", "away_team": "teams", "home_starter": "starters", "away_starter": "starters"}
+
+
+class CompactFeatures:
+    """
+    The feature table as plain arrays, sorted by date:
+
+    date        datetime64[ns]
+    codes       {name column: categorical codes, -1 for none (TBD starters)}
+    categories  {"teams": Index, "starters": Index}, in order of first appearance
+    values      (games, features) matrix of the model feature columns
+    target      int8, -1 for scheduled games
+    inputs      values run through the model's scaler, as float32, or None
+
+    Home and away columns share one category list, so a team's code is the
+    same on both sides. Slicing by date (between()) hands out views of
+    every array; the category lists are shared by all slices.
+    """
+
+    def __init__(self, date, codes, categories, values, columns, target, inputs=None):
+        self.date = date
+        self.codes = codes
+        self.categories = categories
+        self.values = values
+        self.columns = columns
+        self.target = target
+        self.inputs = inputs
+
+    @classmethod
+    def from_frame(cls, df, scaler=None, dtype=np.float32):
+        """
+        Convert a feature table frame. With a scaler the model inputs are
+        scaled from the float64 columns before the cast to float32 (which
+        is where XGBoost casts them too), so predictions are unchanged.
+        """
+        if not df["date"].is_monotonic_increasing:
+            df = df.sort_values("date", kind="stable")
+        columns = [column for column in df.columns if column not in NON_FEATURE_COLUMNS]
+
+        categories = {}
+        for kind in ("teams", "starters"):
+            names = [df[column] for column, k in NAME_COLUMNS.items() if k == kind]
+            categories[kind] = pd.Index(pd.concat(names).dropna().unique())
+        codes = {
+            column: pd.Categorical(df[column], categories=categories[kind]).codes
+            for column, kind in NAME_COLUMNS.items()
+        }
+
+        inputs = None
+        if scaler is not None:
+            inputs = np.asarray(scaler.transform(df[columns]), dtype=np.float32)
+        return cls(
+            df["date"].to_numpy("datetime64[ns]"), codes, categories, df[columns].to_numpy(dtype),
+            columns, df["target"].to_numpy(np.int8), inputs,
+        )
+
+    def __len__(self):
+        return len(self.target)
+
+    def take(self, rows):
+        """Rows by slice (views of every array) or by positions / boolean mask (copies)."""
+        return CompactFeatures(
+            self.date[rows], {column: codes[rows] for column, codes in self.codes.items()}, self.categories,
+            self.values[rows], self.columns, self.target[rows], None if self.inputs is None else self.inputs[rows],
+        )
+
+    def between(self, start=None, end=None):
+        """Games from start to end (inclusive YYYY-MM-DD dates), as views."""
+        lo = 0 if start is None else np.searchsorted(self.date, np.datetime64(pd.Timestamp(start)), side="left")
+        hi = len(self) if end is None else np.searchsorted(self.date, np.datetime64(pd.Timestamp(end)), side="right")
+        return self.take(slice(lo, max(hi, lo)))
+
+    def scheduled(self):
+        return self.take(self.target == -1)
+
+    def completed(self):
+        return self.take(self.target != -1)
+
+    def column(self, name):
+        """One column, name columns as a pd.Categorical over the codes."""
+        if name in self.codes:
+            categories = self.categories[NAME_COLUMNS[name]]
+            return pd.Categorical.from_codes(self.codes[name], categories=categories, validate=False)
+        if name == "date":
+            return self.date
+        if name == "target":
+            return self.target
+        return self.values[:, self.columns.index(name)]
+
+    def feature_frame(self):
+        """The feature columns as a DataFrame over values, without a copy."""
+        return pd.DataFrame(self.values, columns=self.columns, copy=False)
+
+    @property
+    def nbytes(self):
+        arrays = [self.date, self.values, self.target, *self.codes.values()]
+        if self.inputs is not None:
+            arrays.append(self.inputs)
+        return sum(array.nbytes for array in arrays)
+
+
+def load_compact(scaler=None, start=None, end=None, home_team=None, away_team=None, scheduled_only=False,
+                 completed_only=False, dtype=np.float32, store_path=STORE_FILE, csv_path=CSV_FILE):
+    """
+    read_features() (same filters) converted to CompactFeatures. Pass the
+    model's scaler to precompute the model-input matrix once for every
+    consumer.
+    """
+    df = read_features(start=start, end=end, home_team=home_team, away_team=away_team, scheduled_only=scheduled_only,
+                       completed_only=completed_only, store_path=store_path, csv_path=csv_path)
+    with metrics.stage("compact_features", rows=len(df)):
+        return CompactFeatures.from_frame(df, scaler, dtype)
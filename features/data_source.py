@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.instrumentation import metrics
+
+ARCHIVE_FILE = "data/statsapi_archive.sqlite"
+
+# live: straight to statsapi; record: answer from the archive, fetch and
+# archive what it lacks; replay: answer from the archive only
+MODES = ("live", "record", "replay")
+# Defaults for every StatsApiSource, so scripts run offline without new flags
+MODE_ENV = "MLB_STATSAPI_MODE"
+ARCHIVE_ENV = "MLB_STATSAPI_ARCHIVE"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    response TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+"""
+
+
+class ReplayMiss(LookupError):
+    """A replay-mode request that is not in the archive."""
+
+
+class ResponseArchive:
+    """SQLite archive of statsapi responses (as JSON) keyed by the request."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, key):
+        """(True, response) if the request is archived, else (False, None)."""
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return (False, None) if row is None else (True, json.loads(row[0]))
+
+    def put(self, key, method, response):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, method, response, recorded_at) VALUES (?, ?, ?, ?)",
+                (key, method, json.dumps(response), time.time()),
+            )
+
+    def summary(self):
+        """{method: archived responses}."""
+        with self.lock:
+            rows = self.conn.execute("SELECT method, COUNT(*) FROM responses GROUP BY method ORDER BY method").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class StatsApiSource:
+    """
+    The statsapi calls the feature build makes (lookup_player,
+    player_stat_data, lookup_team, roster, schedule and raw endpoint gets)
+    behind one object, so callers can swap in an archive or a fake.
+
+    In record mode responses come from the archive when present and are
+    fetched and archived otherwise; replay mode never touches the network
+    and raises ReplayMiss for anything not archived. Identical requests
+    made concurrently share one fetch. Counters: hits (answered from the
+    archive), misses (not in it), coalesced (waited on an identical
+    in-flight request), errors (failed fetches).
+    """
+
+    def __init__(self, mode=None, archive_path=None, api=None):
+        self.mode = mode or os.environ.get(MODE_ENV, "live")
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown statsapi mode {self.mode!r}, expected one of {', '.join(MODES)}")
+        self.archive = None
+        if self.mode != "live":
+            self.archive = ResponseArchive(archive_path or os.environ.get(ARCHIVE_ENV, ARCHIVE_FILE))
+        self.api = api
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, mode=self.mode)
+
+    def backend(self):
+        if self.api is None:
+            # statsapi (and requests) only load once a request really goes out
+            import statsapi
+            self.api = statsapi
+        return self.api
+
+    def call(self, method, *args, **kwargs):
+        key = json.dumps([method, args, kwargs], sort_keys=True)
+
+        if self.archive is not None:
+            found, response = self.archive.get(key)
+            metrics.cache("statsapi_archive", found)
+            if found:
+                self.count("hits")
+                return response
+            self.count("misses")
+            if self.mode == "replay":
+                raise ReplayMiss(f"{method}{args}{kwargs or ''} is not in {self.archive.path}")
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = Future()
+            else:
+                self.counters["coalesced"] += 1
+        if not owner:
+            metrics.count("statsapi_coalesced")
+            return future.result()
+
+        try:
+            metrics.count("statsapi_calls")
+            with metrics.timed(f"statsapi.{method}"):
+                response = getattr(self.backend(), method)(*args, **kwargs)
+            if self.archive is not None:
+                self.archive.put(key, method, response)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            self.count("errors")
+            metrics.count("statsapi_errors")
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def lookup_player(self, name):
+        return self.call("lookup_player", name)
+
+    def player_stat_data(self, personId):
+        return self.call("player_stat_data", personId=personId)
+
+    def lookup_team(self, name):
+        return self.call("lookup_team", name)
+
+    def roster(self, teamId, rosterType="active"):
+        return self.call("roster", teamId, rosterType=rosterType)
+
+    def schedule(self, date=None, team=""):
+        return self.call("schedule", date=date, team=team)
+
+    def get(self, endpoint, params):
+        return self.call("get", endpoint, params)
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_source():
+    """The shared StatsApiSource, created from the environment on first use."""
+    global _source
+    with _source_lock:
+        if _source is None:
+            _source = StatsApiSource()
+        return _source
+
+
+def set_source(source):
+    """Make `source` the shared StatsApiSource (e.g. one built from command-line flags)."""
+    global _source
+    with _source_lock:
+        _source = source
+    return source
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the statsapi response archive")
+    parser.add_argument("--archive", type=str, default=ARCHIVE_FILE, help="Path to the SQLite archive")
+    args = parser.parse_args()
+
+    archive = ResponseArchive(args.archive)
+    summary = archive.summary()
+    for method, count in summary.items():
+        print(f"{method}: {count}")
+    print(f"{sum(summary.values())} responses archived in {args.archive}")
+    archive.close()
@@ -1,103 +1,250 @@
+import argparse
+import os
+import sys
+
 import pandas as pd
-from tqdm import tqdm
-from get_stats import get_pitcher_stat, get_game_stats, get_pitcher_stat_cached
-
-print("Running feature engineering...")
-
-# Load CSV
-df = pd.read_csv("data/mlb-2025-asplayed.csv")
-
-# Convert dates to datetime
-df["Date"] = pd.to_datetime(df["Date"])
-
-# Sort chronologically
-df = df.sort_values("Date").reset_index(drop=True)
-
-# Add home_win column for completed games
-df["home_win"] = (df["Home Score"] > df["Away Score"]).astype(int)
-
-# Containers for team stats and features
-team_stats = {}  # Running stats per team
-features = []
-
-for idx, row in tqdm(df.iterrows(), total=len(df), desc="Processing games", colour="cyan"):
-    date = row["Date"]
-    home = row["Home"]
-    away = row["Away"]
-    status = row["Status"]
-    home_score = row.get("Home Score", 0)
-    away_score = row.get("Away Score", 0)
-    away_starter = row.get("Away Starter", 0)
-    home_starter = row.get("Home Starter", 0)
-    home_win = row.get("home_win", 0)
-
-    # Initialize team stats if first occurrence
-    for team in [home, away]:
-        if team not in team_stats:
-            team_stats[team] = {
-                "games": 0,
-                "wins": 0,
-                "runs_scored": 0,
-                "runs_allowed": 0,
-                "last10": []
-            }
-
-    home_record = team_stats[home]
-    away_record = team_stats[away]
-
-    # Compute features based on historical stats
-    feat = {
-        "date": date,
-        "home_team": home,
-        "away_team": away,
-        "home_starter": home_starter,
-        "away_starter": away_starter,
-        "home_win_pct": home_record["wins"] / home_record["games"] if home_record["games"] > 0 else 0.5,
-        "away_win_pct": away_record["wins"] / away_record["games"] if away_record["games"] > 0 else 0.5,
-        "home_last10_win_pct": sum(home_record["last10"][-10:]) / len(home_record["last10"][-10:]) if home_record["last10"] else 0.5,
-        "away_last10_win_pct": sum(away_record["last10"][-10:]) / len(away_record["last10"][-10:]) if away_record["last10"] else 0.5,
-        "home_runs_pg": home_record["runs_scored"] / home_record["games"] if home_record["games"] > 0 else 4.5,
-        "away_runs_pg": away_record["runs_scored"] / away_record["games"] if away_record["games"] > 0 else 4.5,
-        "home_runs_allowed_pg": home_record["runs_allowed"] / home_record["games"] if home_record["games"] > 0 else 4.5,
-        "away_runs_allowed_pg": away_record["runs_allowed"] / away_record["games"] if away_record["games"] > 0 else 4.5,
-        "home_pitcher_era": get_pitcher_stat_cached(player_name=home_starter, stat="era") if pd.notna(home_starter) else 4.25,
-        "away_pitcher_era": get_pitcher_stat_cached(player_name=away_starter, stat="era") if pd.notna(away_starter) else 4.25,
-        "home_pitcher_whip": get_pitcher_stat_cached(player_name=home_starter, stat="whip") if pd.notna(home_starter) else 1.35,
-        "away_pitcher_whip": get_pitcher_stat_cached(player_name=away_starter, stat="whip") if pd.notna(away_starter) else 1.35,
-        "home_score": home_score,
-        "away_score": away_score,
-        # Target: 1/0 for played games, -1 for scheduled
-        "target": home_win if status != "Scheduled" else -1
-    }
-
-    features.append(feat)
-
-    # Update stats only for completed games
-    if status != "Scheduled":
-        team_stats[home]["games"] += 1
-        team_stats[home]["wins"] += 1 if home_win else 0
-        team_stats[home]["runs_scored"] += home_score
-        team_stats[home]["runs_allowed"] += away_score
-        team_stats[home]["last10"].append(1 if home_win else 0)
-        if len(team_stats[home]["last10"]) > 10:
-            team_stats[home]["last10"].pop(0)
-
-        team_stats[away]["games"] += 1
-        team_stats[away]["wins"] += 0 if home_win else 1
-        team_stats[away]["runs_scored"] += away_score
-        team_stats[away]["runs_allowed"] += home_score
-        team_stats[away]["last10"].append(0 if home_win else 1)
-        if len(team_stats[away]["last10"]) > 10:
-            team_stats[away]["last10"].pop(0)
-
-# Save features
-features_df = pd.DataFrame(features)
-# Select numeric columns only
-numeric_cols = features_df.select_dtypes(include='number').columns
-
-# Fill NaNs only for numeric columns
-features_df[numeric_cols] = features_df[numeric_cols].fillna(0.5)
-
-features_df.to_csv("data/mlb_features.csv", index=False)
-
-print("Feature engineering complete. Features saved to data/mlb_features.csv")
+
+# Allow running as `python features/feature_engineering.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from features.data_source import MODES, ARCHIVE_FILE, StatsApiSource, set_source
+from features.feature_store import StoreWriter, write_store
+from features.get_stats import get_pitcher_stat_cached, prefetch_pitcher_stats, prefetch_game_logs, pitcher_game_logs
+from features.rolling import RollingBatch, RollingTracker, parse_specs, feature_columns
+from features.team_features import (
+    FEATURE_COLUMNS, load_schedule, iter_schedule_chunks, build_features, starters_by_season, team_state, last_completed_date,
+    load_team_state, save_team_state, pregame_pitcher_stats
+)
+from utils.instrumentation import metrics
+
+
+def written_prefix(path, as_of):
+    """
+    Byte offset just past the rows of an existing feature file dated on or
+    before as_of, or None if those rows are not a prefix of the file.
+    """
+    dates = pd.to_datetime(pd.read_csv(path, usecols=["date"])["date"])
+    n_rows = int((dates <= as_of).sum())
+    if not (dates.iloc[:n_rows] <= as_of).all():
+        return None, 0
+
+    with open(path, "rb") as f:
+        for _ in range(n_rows + 1):  # header + kept rows
+            f.readline()
+        return f.tell(), n_rows
+
+
+def prefetch(games, args):
+    # Fetch every uncached starter once, concurrently, before building rows
+    for season, names in starters_by_season(games).items():
+        if args.pitcher_stats == "as-of":
+            with metrics.stage("prefetch_game_logs") as stage:
+                fetched = prefetch_game_logs(names, season=season, max_workers=args.workers)
+                stage.rows = len(names)
+            if fetched:
+                print(f"Fetched game logs for {fetched} {season} pitchers.")
+            continue
+        with metrics.stage("prefetch_pitcher_stats") as stage:
+            fetched = prefetch_pitcher_stats(names, season=season, max_workers=args.workers)
+            stage.rows = len(names)
+        if fetched:
+            print(f"Fetched stats for {fetched} {season} pitchers.")
+
+
+def pitcher_history(games, args):
+    """Pre-game starter stats for the games' starters in --pitcher-stats as-of mode, else None."""
+    if args.pitcher_stats != "as-of":
+        return None
+    with metrics.stage("pitcher_history") as stage:
+        logs = pd.concat(
+            [pitcher_game_logs(names, season) for season, names in starters_by_season(games).items()]
+            or [pitcher_game_logs([])]
+        )
+        stage.rows = len(logs)
+        return pregame_pitcher_stats(logs)
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(description="Build model features from as-played schedules")
+    parser.add_argument("--schedule", nargs="+", default=["data/mlb-2025-asplayed.csv"], help="As-played CSV file(s), one per season")
+    parser.add_argument("--output", type=str, default="data/mlb_features.csv", help="Where to write the feature table")
+    parser.add_argument("--incremental", action="store_true", help="Only process games after the last checkpointed date")
+    parser.add_argument("--state", type=str, default="data/team_state.json", help="Team state checkpoint file")
+    parser.add_argument("--stream", action="store_true", help="Read the schedule(s) in date-ordered chunks with constant memory")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Schedule rows per chunk in --stream mode")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent pitcher stat requests on a cold cache")
+    parser.add_argument("--api-mode", choices=MODES, default=None, help="statsapi access: live, record to or replay from the response archive (default: $MLB_STATSAPI_MODE or live)")
+    parser.add_argument("--api-archive", type=str, default=None, help=f"statsapi response archive (default: $MLB_STATSAPI_ARCHIVE or {ARCHIVE_FILE})")
+    parser.add_argument("--pitcher-stats", choices=["season", "as-of"], default="season",
+                        help="Starter ERA/WHIP: season line, or season to date before each game from cached game logs")
+    parser.add_argument("--rolling", nargs="+", default=[], metavar="SPEC",
+                        help="Extra rolling features, e.g. last5_win last20_win ewm0.1_run_diff split_win (see features/rolling.py)")
+    return parser
+
+
+def report_source(source):
+    stats = source.stats()
+    if stats["mode"] != "live" or stats["errors"]:
+        print(f"statsapi ({stats['mode']}): {stats['hits']} archive hits, {stats['misses']} misses, "
+              f"{stats['coalesced']} coalesced, {stats['errors']} errors")
+
+
+def build_streaming(args, updaters):
+    """
+    Build features chunk by chunk, carrying team state across chunks and
+    appending rows to the CSV and Arrow store as they are produced.
+    Returns (as_of, state, rolling tracker) for the checkpoint.
+    """
+    state, as_of, checkpoint_state, scheduled_seen = None, None, None, False
+    # Rolling features take the loop path here, carried across chunks like the team state
+    tracker = RollingTracker(updaters) if updaters else None
+    checkpoint_rolling = None
+    store_path = os.path.splitext(args.output)[0] + ".arrow"
+    with open(args.output, "w", newline="") as out, StoreWriter(store_path, FEATURE_COLUMNS + feature_columns(updaters)) as store:
+        for i, chunk in enumerate(iter_schedule_chunks(args.schedule, args.chunksize)):
+            metrics.count("schedule_rows", len(chunk))
+            prefetch(chunk, args)
+            chunk_tracker = tracker.copy() if tracker and not scheduled_seen else None
+            with metrics.stage("build_features", rows=len(chunk)):
+                features_df = build_features(
+                    chunk, pitcher_stat=get_pitcher_stat_cached, state=state, rolling=tracker, pitcher_history=pitcher_history(chunk, args)
+                )
+            with metrics.stage("write_features", rows=len(features_df)):
+                features_df.to_csv(out, index=False, header=(i == 0))
+                store.write(features_df)
+
+            with metrics.stage("team_state", rows=len(chunk)):
+                new_state = team_state(chunk, state)
+
+            # The checkpoint stops at the last date before the first scheduled game
+            if not scheduled_seen:
+                scheduled = chunk.loc[chunk["Status"] == "Scheduled", "Date"]
+                if scheduled.empty:
+                    as_of, checkpoint_state = chunk["Date"].max(), new_state
+                    checkpoint_rolling = tracker and tracker.copy()
+                else:
+                    scheduled_seen = True
+                    before = chunk[chunk["Date"] < scheduled.min()]
+                    if not before.empty:
+                        as_of, checkpoint_state = before["Date"].max(), team_state(before, state)
+                        if chunk_tracker:
+                            chunk_tracker.features(before)
+                        checkpoint_rolling = chunk_tracker
+
+            # Older seasons can't change any more
+            season = chunk["Date"].dt.year.max()
+            state = {year: teams for year, teams in new_state.items() if year >= season}
+            if tracker:
+                tracker.teams = {year: teams for year, teams in tracker.teams.items() if year >= season}
+            print(f"Processed games through {chunk['Date'].max().date()}")
+    return as_of, checkpoint_state, checkpoint_rolling
+
+
+def build_all(args, updaters):
+    """
+    Build the whole schedule at once, or with --incremental only the games
+    after the checkpoint, then write the new checkpoint.
+    """
+    # Load and sort the schedule(s)
+    with metrics.stage("load_schedule") as stage:
+        df = load_schedule(args.schedule)
+        stage.rows = len(df)
+
+    checkpoint = None
+    if args.incremental:
+        if os.path.exists(args.state) and os.path.exists(args.output):
+            checkpoint = load_team_state(args.state)
+        else:
+            print("No checkpoint found, building all games.")
+
+    offset = None
+    if checkpoint is not None:
+        as_of = checkpoint["as_of"]
+        offset, n_kept = written_prefix(args.output, as_of)
+        # The kept rows must be exactly the schedule's games up to the checkpoint
+        if offset is None or n_kept != int((df["Date"] <= as_of).sum()):
+            print(f"Checkpoint from {as_of.date()} does not match {args.output}, building all games.")
+            offset = None
+        # Appended rows must have the same columns as the kept ones
+        elif (checkpoint["rolling"] or {}).get("specs", []) != [updater.name for updater in updaters]:
+            print(f"Checkpoint from {as_of.date()} has different rolling features, building all games.")
+            offset = None
+        elif checkpoint["pitcher_stats"] != args.pitcher_stats:
+            print(f"Checkpoint from {as_of.date()} has {checkpoint['pitcher_stats']} pitcher stats, building all games.")
+            offset = None
+
+    if offset is not None:
+        # New games and games that went Scheduled -> Final, plus every scheduled
+        # game, continue from the saved team state. Earlier rows are left as is.
+        new_games = df[df["Date"] > as_of].reset_index(drop=True)
+        print(f"Updating {len(new_games)} games after {as_of.date()}...")
+        prefetch(new_games, args)
+        tracker = RollingTracker.from_json(checkpoint["rolling"]) if updaters else None
+        with metrics.stage("build_features", rows=len(new_games)):
+            features_df = build_features(
+                new_games, pitcher_stat=get_pitcher_stat_cached, state=checkpoint["teams"], rolling=tracker and tracker.copy(),
+                pitcher_history=pitcher_history(new_games, args)
+            )
+
+        with metrics.stage("write_features", rows=len(features_df)):
+            with open(args.output, "r+b") as f:
+                f.seek(offset)
+                f.truncate()
+                f.write(features_df.to_csv(index=False, header=False).encode("utf-8"))
+
+        # Refresh the columnar store from the updated file
+        with metrics.stage("write_store"):
+            write_store(pd.read_csv(args.output), os.path.splitext(args.output)[0] + ".arrow")
+        start_state, done = checkpoint["teams"], new_games
+    else:
+        # Build every feature column for the whole schedule at once
+        prefetch(df, args)
+        with metrics.stage("build_features", rows=len(df)):
+            features_df = build_features(
+                df, pitcher_stat=get_pitcher_stat_cached, rolling=RollingBatch(updaters) if updaters else None,
+                pitcher_history=pitcher_history(df, args)
+            )
+        with metrics.stage("write_features", rows=len(features_df)):
+            features_df.to_csv(args.output, index=False)
+        with metrics.stage("write_store", rows=len(features_df)):
+            write_store(features_df, os.path.splitext(args.output)[0] + ".arrow")
+        start_state, done = None, df
+        tracker = RollingTracker(updaters) if updaters else None
+
+    # Checkpoint the running team state as of the last fully completed date
+    new_as_of = last_completed_date(df)
+    if new_as_of is not None:
+        with metrics.stage("team_state", rows=len(done)):
+            done = done[done["Date"] <= new_as_of]
+            if tracker:
+                # The loop path leaves the rolling state where the next build picks up
+                tracker.features(done)
+            save_team_state(args.state, new_as_of, team_state(done, start_state), tracker, args.pitcher_stats)
+
+
+def main():
+    parser = make_parser()
+    args = parser.parse_args()
+    try:
+        updaters = parse_specs(args.rolling)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.stream and args.incremental:
+        parser.error("--stream and --incremental can't be combined")
+
+    source = set_source(StatsApiSource(args.api_mode, args.api_archive))
+
+    print("Running feature engineering...")
+    if args.stream:
+        new_as_of, new_state, new_rolling = build_streaming(args, updaters)
+        if new_as_of is not None:
+            save_team_state(args.state, new_as_of, new_state, new_rolling, args.pitcher_stats)
+    else:
+        build_all(args, updaters)
+
+    report_source(source)
+    print(f"Feature engineering complete. Features saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
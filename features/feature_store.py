@@ -0,0 +1,173 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+except ImportError:  # pyarrow is optional; readers fall back to the CSV
+    pa = None
+
+from features.team_features import FEATURE_COLUMNS
+from utils.instrumentation import metrics
+
+CSV_FILE = "data/mlb_features.csv"
+STORE_FILE = "data/mlb_features.arrow"
+
+
+def feature_schema(columns=FEATURE_COLUMNS):
+    """
+    Arrow schema of the feature table, fixed so chunks written separately
+    line up. Columns past FEATURE_COLUMNS (rolling features) are floats.
+    """
+    string_columns = ["home_team", "away_team", "home_starter", "away_starter"]
+    fields = [pa.field("date", pa.timestamp("ns"))]
+    for column in columns[1:]:
+        if column in string_columns:
+            fields.append(pa.field(column, pa.string()))
+        elif column == "target":
+            fields.append(pa.field(column, pa.int64()))
+        else:
+            fields.append(pa.field(column, pa.float64()))
+    return pa.schema(fields)
+
+
+class StoreWriter:
+    """
+    Writes the feature table to an uncompressed Arrow IPC (Feather v2) file
+    one batch at a time, so readers can memory-map it and binary-search
+    dates. Batches must arrive in date order. The file is only moved into
+    place on a clean close. Does nothing if pyarrow is not installed.
+    """
+
+    def __init__(self, store_path=STORE_FILE, columns=FEATURE_COLUMNS):
+        self.store_path = store_path
+        self.tmp_path = store_path + ".tmp"
+        self.columns = list(columns)
+        self.writer = None
+        if pa is not None:
+            self.schema = feature_schema(self.columns)
+            self.sink = pa.OSFile(self.tmp_path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def write(self, features_df):
+        if self.writer is None or features_df.empty:
+            return
+        df = features_df[self.columns].copy()
+        df["date"] = pd.to_datetime(df["date"])
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        # One contiguous batch per write keeps columns zero-copy when mapped
+        self.writer.write_table(table.combine_chunks(), max_chunksize=max(len(table), 1))
+
+    def close(self, commit=True):
+        if self.writer is None:
+            return
+        self.writer.close()
+        self.sink.close()
+        self.writer = None
+        if commit:
+            os.replace(self.tmp_path, self.store_path)
+        else:
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+        return False
+
+
+def write_store(features_df, store_path=STORE_FILE):
+    """Write a whole feature table (sorted by date) to the Arrow store."""
+    if pa is None:
+        return False
+    df = features_df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    with StoreWriter(store_path, columns=df.columns) as writer:
+        writer.write(df.sort_values("date", kind="stable"))
+    return True
+
+
+def store_is_fresh(store_path=STORE_FILE, csv_path=CSV_FILE):
+    """True if the Arrow store exists and is at least as new as the CSV."""
+    if pa is None or not os.path.exists(store_path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(store_path) >= os.path.getmtime(csv_path)
+
+
+def read_features(columns=None, start=None, end=None, home_team=None, away_team=None,
+                  scheduled_only=False, completed_only=False, store_path=STORE_FILE, csv_path=CSV_FILE):
+    """
+    Load rows and columns of the feature table.
+
+    start/end are inclusive YYYY-MM-DD dates; home_team/away_team match
+    exactly; scheduled_only / completed_only pick target == -1 / != -1.
+    Reads the memory-mapped Arrow store when it is up to date, so only the
+    requested date range and columns are materialized; otherwise parses
+    the CSV. The date column always comes back as datetime64.
+    """
+    fresh = store_is_fresh(store_path, csv_path)
+    metrics.cache("feature_store", fresh)
+    with metrics.stage("read_features") as stage:
+        if fresh:
+            df = _read_store(store_path, columns, start, end, home_team, away_team, scheduled_only, completed_only)
+        else:
+            df = _read_csv(csv_path, columns, start, end, home_team, away_team, scheduled_only, completed_only)
+        stage.rows = len(df)
+    return df
+
+
+def _read_store(path, columns, start, end, home_team, away_team, scheduled_only, completed_only):
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    # Dates are sorted, so a date range is a contiguous slice
+    if start is not None or end is not None:
+        dates = table.column("date").to_numpy()
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side="left")
+        hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side="right")
+        table = table.slice(lo, max(hi - lo, 0))
+
+    mask = None
+    for column, value in [("home_team", home_team), ("away_team", away_team)]:
+        if value is not None:
+            condition = pc.equal(table.column(column), value)
+            mask = condition if mask is None else pc.and_(mask, condition)
+    if scheduled_only or completed_only:
+        condition = pc.equal(table.column("target"), -1)
+        if completed_only:
+            condition = pc.invert(condition)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    if mask is not None:
+        table = table.filter(mask)
+
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas()
+
+
+def _read_csv(path, columns, start, end, home_team, away_team, scheduled_only, completed_only):
+    filter_columns = ["date", "home_team", "away_team", "target"]
+    usecols = None if columns is None else list(dict.fromkeys(list(columns) + filter_columns))
+    df = pd.read_csv(path, usecols=usecols)
+    df["date"] = pd.to_datetime(df["date"])
+
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df["date"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["date"] <= pd.Timestamp(end)
+    if home_team is not None:
+        mask &= df["home_team"] == home_team
+    if away_team is not None:
+        mask &= df["away_team"] == away_team
+    if scheduled_only:
+        mask &= df["target"] == -1
+    if completed_only:
+        mask &= df["target"] != -1
+
+    df = df[mask].reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
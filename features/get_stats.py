@@ -1,50 +1,249 @@
-import statsapi
-import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from features.data_source import ReplayMiss, get_source
+from features.pitcher_store import PitcherStatStore
+from features.player_index import get_player_index
+from utils.instrumentation import metrics
 
 DATA_DIR = "data"
+STORE_FILE = os.path.join(DATA_DIR, "pitcher_stats.sqlite")
+# Old JSON cache (2025 season values), imported into the store on first use
 CACHE_FILE = os.path.join(DATA_DIR, "pitcher_stats_cache.json")
+CACHE_FILE_SEASON = "2025"
+
+# Stats the feature table uses; fetched together so one request fills them all
+PITCHER_STATS = ("era", "whip")
+
+# Open the store
+pitcher_store = PitcherStatStore(STORE_FILE)
+if pitcher_store.is_empty() and os.path.exists(CACHE_FILE):
+    pitcher_store.import_json(CACHE_FILE, CACHE_FILE_SEASON)
+
+
+def resolve_player(player_name, season="2025", api=None):
+    """(api, player ID) for a name. Raises if the lookup fails."""
+    player_id = None
+    api = api or get_source()
+    if api is get_source():
+        # IDs come from the season's player index; only names it doesn't
+        # know go through a lookup request
+        index = get_player_index(season)
+        player_id = index.player_id(player_name) if index is not None else None
+        metrics.cache("player_index", player_id is not None)
+    if player_id is None:
+        player_id = api.lookup_player(player_name)[0]['id']
+    return api, player_id
+
+
+def fetch_pitcher_stats(player_name, stats=PITCHER_STATS, season="2025", api=None):
+    """
+    Look a pitcher up and return {stat: value} from their season line, with
+    None for stats that have no value. Raises if the lookup fails.
+    """
+    api, player_id = resolve_player(player_name, season, api)
+    stats_list = api.player_stat_data(personId=player_id)['stats']
+    season_line = next(
+        (s['stats'] for s in stats_list
+         if s.get('group') == 'pitching' and s.get('type') == 'season' and s.get('season') == season),
+        None
+    )
+    return {
+        stat: float(season_line[stat]) if season_line is not None and stat in season_line else None
+        for stat in stats
+    }
 
-# Load cache
-if os.path.exists(CACHE_FILE):
-    with open(CACHE_FILE, "r") as f:
-        pitcher_cache = json.load(f)
-else:
-    pitcher_cache = {}
 
 def get_pitcher_stat_cached(player_name, stat, season="2025"):
-    # Check cache first
-    if player_name in pitcher_cache and stat in pitcher_cache[player_name]:
-        return pitcher_cache[player_name][stat]
+    # Check the store first
+    cached = pitcher_store.get(player_name, season, [stat])
+    metrics.cache("pitcher_store", stat in cached)
+    if stat in cached:
+        return cached[stat]
 
     try:
-        # Fetch from API
-        player_id = statsapi.lookup_player(player_name)[0]['id']
-        stats_list = statsapi.player_stat_data(personId=player_id)['stats']
-        value = next(
-            (float(s['stats'][stat]) for s in stats_list
-             if s.get('group') == 'pitching' and s.get('type') == 'season' and s.get('season') == season),
-            None
-        )
-
-        # Initialize dictionary if player not in cache
-        if player_name not in pitcher_cache:
-            pitcher_cache[player_name] = {}
-
-        # Add/Update stat
-        pitcher_cache[player_name][stat] = value
-
-        # Save updated cache
-        with open(CACHE_FILE, "w") as f:
-            json.dump(pitcher_cache, f)
-
-        return value
+        # Fetch from API, filling the other feature stats in the same request
+        stats = PITCHER_STATS if stat in PITCHER_STATS else (stat,)
+        values = fetch_pitcher_stats(player_name, stats, season)
+
+        # Save all fetched stats in one transaction
+        pitcher_store.put_many([(player_name, season, s, v) for s, v in values.items()])
+
+        return values[stat]
+    except ReplayMiss:
+        # Offline builds must not quietly fill missing stats
+        raise
     except Exception:
-        return None
+        metrics.count("pitcher_stat_failures")
+        # A stale value beats the fill value of a missing one
+        stale = pitcher_store.get(player_name, season, [stat], allow_stale=True)
+        metrics.cache("pitcher_store_stale", stat in stale)
+        return stale.get(stat)
+
+
+class RateLimiter:
+    """Spaces out calls so no more than `rate` start per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def outs_recorded(innings_pitched):
+    """Outs from an innings-pitched string, where "5.1" is 5 1/3 innings."""
+    whole, _, thirds = str(innings_pitched).partition(".")
+    return int(whole) * 3 + int(thirds or 0)
+
 
+def fetch_game_log(player_name, season="2025", api=None):
+    """
+    Every appearance of a pitcher in a season, as (game_pk, date, outs,
+    earned_runs, hits, walks) rows. Raises if the lookup fails.
+    """
+    api, player_id = resolve_player(player_name, season, api)
+    hydrate = f"stats(group=[pitching],type=[gameLog],season={season},sportId=1)"
+    person = api.get("person", {"personId": player_id, "hydrate": hydrate})["people"][0]
+    rows = []
+    for group in person.get("stats", []):
+        for split in group.get("splits", []):
+            stat = split["stat"]
+            outs = stat["outs"] if "outs" in stat else outs_recorded(stat.get("inningsPitched", "0.0"))
+            rows.append((
+                split["game"]["gamePk"], split["date"], int(outs),
+                int(stat.get("earnedRuns", 0)), int(stat.get("hits", 0)), int(stat.get("baseOnBalls", 0)),
+            ))
+    return rows
+
+
+def fetch_concurrently(names, fetch, api=None, max_workers=8, rate=10, retries=3, backoff=0.5):
+    """
+    Yield (name, fetch(name)) for every name, on a bounded thread pool
+    limited to `rate` fetches per second. Failed requests are retried with
+    exponential backoff; names that still fail are reported and skipped.
+    Replay misses are raised, not retried.
+    """
+    # Replayed responses come from disk, so there is nothing to throttle
+    limiter = RateLimiter(0 if getattr(api, "mode", None) == "replay" else rate)
+
+    def fetch_one(name):
+        for attempt in range(retries + 1):
+            limiter.wait()
+            try:
+                return fetch(name)
+            except ReplayMiss:
+                raise
+            except Exception:
+                if attempt == retries:
+                    raise
+                metrics.count("pitcher_stat_retries")
+                time.sleep(backoff * 2 ** attempt + random.uniform(0, backoff))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_one, name): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except ReplayMiss:
+                raise
+            except Exception as e:
+                print(f"Error fetching stats for {name}: {e}")
+                metrics.count("pitcher_stat_failures")
+                continue
+            yield name, result
+
+
+def prefetch_pitcher_stats(player_names, stats=PITCHER_STATS, season="2025", api=None,
+                           max_workers=8, rate=10, retries=3, backoff=0.5):
+    """
+    Fill the pitcher store for every starter in player_names that is missing
+    any of `stats` for the season. Each pitcher is fetched once with all stats in a single
+    request, on a bounded thread pool limited to `rate` fetches per second.
+    Failed requests are retried with exponential backoff; pitchers that
+    still fail are left uncached. Results are stored in one transaction.
+
+    `api` can be any object with statsapi's lookup_player and
+    player_stat_data, e.g. a local fake for tests; by default it is the
+    shared StatsApiSource. Replay misses are raised, not retried.
+
+    Returns the number of pitchers fetched.
+    """
+    names = {name for name in player_names if isinstance(name, str)}
+    missing = sorted(name for name in names if len(pitcher_store.get(name, season, stats)) < len(stats))
+    metrics.cache("pitcher_store_prefetch", True, len(names) - len(missing))
+    metrics.cache("pitcher_store_prefetch", False, len(missing))
+    if not missing:
+        return 0
+
+    if api is None:
+        api = get_source()
+    rows = []
+    fetched = fetch_concurrently(
+        missing, lambda name: fetch_pitcher_stats(name, stats, season, api), api, max_workers, rate, retries, backoff
+    )
+    for name, values in fetched:
+        rows.extend((name, season, stat, value) for stat, value in values.items())
+
+    pitcher_store.put_many(rows)
+    return len({row[0] for row in rows})
+
+
+def prefetch_game_logs(player_names, season="2025", api=None, max_workers=8, rate=10, retries=3, backoff=0.5):
+    """
+    Fill the pitcher store with the season game log of every pitcher in
+    player_names that has none (or a stale one), one request per pitcher,
+    fetched like prefetch_pitcher_stats(). Returns the number fetched.
+    """
+    names = {name for name in player_names if isinstance(name, str)}
+    fresh = pitcher_store.game_logs_fresh(names, season)
+    missing = sorted(names - fresh)
+    metrics.cache("pitcher_game_logs", True, len(fresh))
+    metrics.cache("pitcher_game_logs", False, len(missing))
+    if not missing:
+        return 0
+
+    if api is None:
+        api = get_source()
+    logs = dict(fetch_concurrently(
+        missing, lambda name: fetch_game_log(name, season, api), api, max_workers, rate, retries, backoff
+    ))
+    pitcher_store.put_game_logs(logs, season)
+    return len(logs)
+
+
+def pitcher_game_logs(player_names, season="2025"):
+    """
+    Stored appearances of the given pitchers in a season as a frame with
+    player, season, game_pk, date (datetime), outs, earned_runs, hits and
+    walks columns.
+    """
+    columns = ["player", "game_pk", "date", "outs", "earned_runs", "hits", "walks"]
+    # Typed explicitly: with no stored rows the columns would be object dtype
+    logs = pd.DataFrame(pitcher_store.game_logs(season), columns=columns).astype(
+        {"player": "str", "game_pk": "int64", "outs": "int64", "earned_runs": "int64", "hits": "int64", "walks": "int64"}
+    )
+    logs = logs[logs["player"].isin(set(player_names))].reset_index(drop=True)
+    logs.insert(1, "season", str(season))
+    logs["date"] = pd.to_datetime(logs["date"])
+    return logs
 
 
 def get_pitcher_stat(player_name, stat, season="2025", default=0.0):
+    statsapi = get_source()
     try:
         player_id = statsapi.lookup_player(player_name)[0]["id"]
         stats_list = statsapi.player_stat_data(personId=player_id)["stats"]
@@ -53,14 +252,18 @@ def get_pitcher_stat(player_name, stat, season="2025", default=0.0):
              if s.get("group") == "pitching" and s.get("type") == "season" and s.get("season") == season),
             default
         ))
+    except ReplayMiss:
+        raise
     except Exception:
         return default
-    
+
 def get_game_stats(date, team):
+    statsapi = get_source()
     team_id = get_team_id(team)
     return statsapi.schedule(date=date, team=team_id)
 
 def get_team_id(team):
+    statsapi = get_source()
     team_info = statsapi.lookup_team(team)
     team_id = team_info[0]["id"]
-    return team_id
\ No newline at end of file
+    return team_id
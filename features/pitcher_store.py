@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Current-season values go stale as the season goes on; past seasons never do
+STAT_TTL = 6 * 60 * 60
+# Lookups that found no value are retried after this long
+NEGATIVE_TTL = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pitcher_stats (
+    player TEXT NOT NULL,
+    season TEXT NOT NULL,
+    stat TEXT NOT NULL,
+    value REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (player, season, stat)
+);
+CREATE TABLE IF NOT EXISTS pitcher_misses (
+    player TEXT NOT NULL,
+    season TEXT NOT NULL,
+    stat TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (player, season, stat)
+);
+CREATE TABLE IF NOT EXISTS pitcher_game_logs (
+    player TEXT NOT NULL,
+    season TEXT NOT NULL,
+    game_pk INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    outs INTEGER NOT NULL,
+    earned_runs INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    walks INTEGER NOT NULL,
+    PRIMARY KEY (player, season, game_pk)
+);
+CREATE TABLE IF NOT EXISTS pitcher_game_log_fetches (
+    player TEXT NOT NULL,
+    season TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (player, season)
+);
+"""
+
+
+class PitcherStatStore:
+    """
+    SQLite store of pitcher stats keyed by (player, season, stat), and of
+    pitchers' per-game logs keyed by (player, season, game).
+
+    Values for the current season are refreshed after `ttl` seconds. Lookups
+    that returned no value are kept in a separate negative cache that expires
+    after `negative_ttl`. Writes are batched into single transactions and the
+    database runs in WAL mode, so several feature builds can share it.
+    """
+
+    def __init__(self, path, ttl=STAT_TTL, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def is_empty(self):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM pitcher_stats) + (SELECT COUNT(*) FROM pitcher_misses)"
+            ).fetchone()
+        return row[0] == 0
+
+    def get(self, player, season, stats, allow_stale=False):
+        """
+        Fresh cached values for a pitcher as {stat: value}. Stats in the
+        negative cache map to None; stale or unknown stats are left out,
+        unless allow_stale, which returns stored values of any age (for when
+        a refresh failed).
+        """
+        now = time.time()
+        season = str(season)
+        placeholders = ",".join("?" * len(stats))
+        with self.lock:
+            hits = self.conn.execute(
+                f"SELECT stat, value, fetched_at FROM pitcher_stats "
+                f"WHERE player = ? AND season = ? AND stat IN ({placeholders})",
+                (player, season, *stats),
+            ).fetchall()
+            misses = self.conn.execute(
+                f"SELECT stat, fetched_at FROM pitcher_misses "
+                f"WHERE player = ? AND season = ? AND stat IN ({placeholders})",
+                (player, season, *stats),
+            ).fetchall()
+
+        expires = season == str(datetime.now().year)
+        values = {}
+        for stat, fetched_at in misses:
+            if now - fetched_at < self.negative_ttl:
+                values[stat] = None
+        for stat, value, fetched_at in hits:
+            if allow_stale or not expires or now - fetched_at < self.ttl:
+                values[stat] = value
+        return values
+
+    def put_many(self, rows, fetched_at=None):
+        """
+        Store (player, season, stat, value) rows in one transaction. A value
+        of None records a negative-cache entry instead.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        found, missing = [], []
+        for player, season, stat, value in rows:
+            if value is None:
+                missing.append((player, str(season), stat, fetched_at))
+            else:
+                found.append((player, str(season), stat, float(value), fetched_at))
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pitcher_stats VALUES (?, ?, ?, ?, ?)", found
+            )
+            self.conn.executemany(
+                "DELETE FROM pitcher_misses WHERE player = ? AND season = ? AND stat = ?",
+                [row[:3] for row in found],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pitcher_misses VALUES (?, ?, ?, ?)", missing
+            )
+            self.conn.executemany(
+                "DELETE FROM pitcher_stats WHERE player = ? AND season = ? AND stat = ?",
+                [row[:3] for row in missing],
+            )
+
+    def game_logs_fresh(self, players, season):
+        """The players whose game log for the season is stored and not stale."""
+        now = time.time()
+        season = str(season)
+        with self.lock:
+            fetched = dict(self.conn.execute(
+                "SELECT player, fetched_at FROM pitcher_game_log_fetches WHERE season = ?", (season,)
+            ).fetchall())
+        expires = season == str(datetime.now().year)
+        return {
+            player for player in players
+            if player in fetched and (not expires or now - fetched[player] < self.ttl)
+        }
+
+    def put_game_logs(self, logs, season, fetched_at=None):
+        """
+        Replace the season's game logs of several pitchers in one transaction.
+        logs is {player: [(game_pk, date, outs, earned_runs, hits, walks)]};
+        an empty list records that the pitcher has no appearances.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        season = str(season)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM pitcher_game_logs WHERE player = ? AND season = ?",
+                [(player, season) for player in logs],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pitcher_game_logs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(player, season, *row) for player, rows in logs.items() for row in rows],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pitcher_game_log_fetches VALUES (?, ?, ?)",
+                [(player, season, fetched_at) for player in logs],
+            )
+
+    def game_logs(self, season):
+        """Every stored appearance of the season as (player, game_pk, date, outs, earned_runs, hits, walks) rows."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT player, game_pk, date, outs, earned_runs, hits, walks FROM pitcher_game_logs WHERE season = ?",
+                (str(season),),
+            ).fetchall()
+
+    def import_json(self, path, season):
+        """
+        Load the old {player: {stat: value}} JSON cache as one season's
+        values, dated by the file. Its misses are dated now, so they are not
+        already expired when imported.
+        """
+        with open(path, "r") as f:
+            cache = json.load(f)
+        rows = [
+            (player, season, stat, value)
+            for player, stats in cache.items()
+            for stat, value in stats.items()
+        ]
+        self.put_many([row for row in rows if row[3] is not None], fetched_at=os.path.getmtime(path))
+        self.put_many([row for row in rows if row[3] is None])
+        return len(rows)
+
+    def purge(self):
+        """Drop expired negative-cache entries and compact the database file."""
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM pitcher_misses WHERE fetched_at < ?", (time.time() - self.negative_ttl,)
+                )
+            self.conn.execute("VACUUM")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the pitcher stats store")
+    parser.add_argument("--db", type=str, default="data/pitcher_stats.sqlite", help="Store file")
+    parser.add_argument("--import-json", type=str, help="Import an old JSON pitcher cache")
+    parser.add_argument("--season", type=str, default="2025", help="Season the imported JSON cache belongs to")
+    parser.add_argument("--purge", action="store_true", help="Drop expired misses and compact the file")
+    args = parser.parse_args()
+
+    store = PitcherStatStore(args.db)
+    if args.import_json:
+        n_rows = store.import_json(args.import_json, args.season)
+        print(f"Imported {n_rows} stats from {args.import_json} for {args.season}.")
+    if args.purge:
+        store.purge()
+        print(f"Purged expired entries from {args.db}.")
+    store.close()
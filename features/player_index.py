@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+
+# Allow running as `python features/player_index.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from features.data_source import ReplayMiss, get_source
+from utils.instrumentation import metrics
+
+INDEX_DIR = "data"
+INDEX_FILE = os.path.join(INDEX_DIR, "player_index_{season}.json")
+
+
+def strip_accents(text):
+    """Normalize string by removing accents."""
+    return "".join(
+        c for c in unicodedata.normalize("NFD", text)
+        if unicodedata.category(c) != "Mn"
+    )
+
+
+def normalize_name(name):
+    """Accent-, case- and whitespace-insensitive form of a name."""
+    return " ".join(strip_accents(name).casefold().split())
+
+
+def garbled_key(name):
+    """
+    Form of a name that a copy with its accented letters garbled to '�'
+    shares with the original: every non-ASCII character is dropped, so
+    'Jos� Berr�os' and 'José Berríos' both become 'jos berros'.
+    """
+    return " ".join(re.sub(r"[^\x00-\x7f]", "", name).casefold().split())
+
+
+class PlayerIndex:
+    """
+    Every player of a season with their ID and team, held in dicts keyed by
+    normalized name, garbled-tolerant name and team, so lookups make no API
+    calls. Built from one season-wide players request and one teams request,
+    then persisted as JSON.
+    """
+
+    def __init__(self, season, players, teams, built_at=None):
+        self.season = str(season)
+        self.players = players  # [{"id", "name", "team_id"}]
+        self.teams = teams  # {team_id (str): team name}
+        self.built_at = built_at or time.time()
+
+        self.by_name = {}
+        self.by_garbled = {}
+        for player in players:
+            self.by_name.setdefault(normalize_name(player["name"]), []).append(player)
+            self.by_garbled.setdefault(garbled_key(player["name"]), []).append(player)
+        self.team_ids = {normalize_name(name): int(team_id) for team_id, name in teams.items()}
+
+    @classmethod
+    def build(cls, season, api=None):
+        api = api or get_source()
+        season = str(season)
+        people = api.get("sports_players", {"season": season, "sportId": 1})["people"]
+        players = [
+            {"id": p["id"], "name": p["fullName"], "team_id": p.get("currentTeam", {}).get("id")}
+            for p in people
+        ]
+        teams = {
+            str(team["id"]): team["name"]
+            for team in api.get("teams", {"season": season, "sportId": 1})["teams"]
+        }
+        return cls(season, players, teams)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["season"], data["players"], data["teams"], data["built_at"])
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"season": self.season, "built_at": self.built_at, "teams": self.teams, "players": self.players},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def find(self, name, team=None):
+        """
+        The player a (possibly '�'-garbled) name refers to, as
+        {"id", "name", "team_id"}, or None. When several players share the
+        name, the one on `team` (a team name) wins, then the first.
+        """
+        candidates = self.by_name.get(normalize_name(name))
+        if not candidates:
+            candidates = self.by_garbled.get(garbled_key(name)) if "�" in name else None
+        if not candidates:
+            return None
+        if len(candidates) > 1 and team is not None:
+            team_id = self.team_ids.get(normalize_name(team))
+            on_team = [p for p in candidates if p["team_id"] == team_id]
+            if on_team:
+                return on_team[0]
+        return candidates[0]
+
+    def player_id(self, name, team=None):
+        player = self.find(name, team)
+        return None if player is None else player["id"]
+
+    def team_players(self, team):
+        """Players whose current team is `team` (a team name)."""
+        team_id = self.team_ids.get(normalize_name(team))
+        return [p for p in self.players if p["team_id"] == team_id]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_player_index(season="2025", index_file=INDEX_FILE):
+    """
+    The season's PlayerIndex: from memory, else from its JSON file, else
+    built from the API and saved. None if it can't be built (e.g. offline);
+    that is remembered for the rest of the process so callers fall back to
+    per-name lookups without retrying.
+
+    In record and replay mode the JSON file is skipped and the index is
+    always built through the data source, so its two requests are in every
+    recording and a replay depends on the archive alone. Replay misses are
+    raised.
+    """
+    season = str(season)
+    with _indexes_lock:
+        if season not in _indexes:
+            path = index_file.format(season=season)
+            index = None
+            if os.path.exists(path) and get_source().mode == "live":
+                index = PlayerIndex.load(path)
+            else:
+                try:
+                    with metrics.stage("build_player_index") as stage:
+                        index = PlayerIndex.build(season)
+                        stage.rows = len(index.players)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                        index.save(path)
+                except ReplayMiss:
+                    raise
+                except Exception as e:
+                    print(f"Could not build the {season} player index: {e}")
+            _indexes[season] = index
+        return _indexes[season]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the per-season player index")
+    parser.add_argument("--season", type=str, default="2025", help="Season to index")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the index file exists")
+    parser.add_argument("--lookup", type=str, nargs="*", default=[], help="Names to resolve with the index")
+    args = parser.parse_args()
+
+    path = INDEX_FILE.format(season=args.season)
+    if args.rebuild or not os.path.exists(path):
+        PlayerIndex.build(args.season).save(path)
+    index = get_player_index(args.season)
+    print(f"{len(index.players)} players on {len(index.teams)} teams in {path}")
+    for name in args.lookup:
+        print(f"{name} -> {index.find(name)}")
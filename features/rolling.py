@@ -0,0 +1,246 @@
+import copy
+import re
+
+import numpy as np
+import pandas as pd
+
+from features.team_features import DEFAULT_WIN_PCT
+
+# Optional per-team form features, chosen per build with specs such as
+#   last20_win        win % over the last 20 games
+#   last5_run_diff    run differential per game over the last 5 games
+#   ewm0.1_run_diff   exponentially weighted run differential, alpha 0.1
+#   split_win         win % at home for the home team, on the road for the away team
+#   split_run_diff    run differential per game, split the same way
+# Each becomes a home_<spec> and an away_<spec> column.
+#
+# Every updater has two paths that give identical values: a loop path that
+# keeps fixed-size state per team (ring buffers, running sums) and costs
+# O(1) per game, used to continue a build from a checkpoint, and a batch
+# path over a whole team-game table, batch(played, x, keys, side), which
+# returns the pre-game value of every row. Wins and runs are whole
+# numbers, so the windowed sums of both paths are exact; the EWMA runs the
+# same float recurrence in both.
+
+DEFAULTS = {"win": DEFAULT_WIN_PCT, "run_diff": 0.0}
+
+
+def game_value(stat, win, runs_scored, runs_allowed):
+    return float(win) if stat == "win" else float(runs_scored - runs_allowed)
+
+
+def pregame_values(post_game, played, keys, default):
+    """Shift post-game values of played rows to each team's next row (pre-game) and carry over scheduled rows."""
+    values = pd.Series(np.nan, index=range(len(played)))
+    values.loc[played] = post_game
+    values = values.groupby(keys).shift(1).groupby(keys).ffill()
+    return values.fillna(default).to_numpy()
+
+
+class LastN:
+    def __init__(self, stat, n):
+        if n < 1:
+            raise ValueError(f"Window must be at least 1 game, got {n}")
+        self.stat, self.n = stat, n
+        self.name = f"last{n}_{stat}"
+
+    def new_state(self):
+        return {"buffer": [0.0] * self.n, "pos": 0, "count": 0, "sum": 0.0}
+
+    def value(self, state, side):
+        if state["count"] == 0:
+            return DEFAULTS[self.stat]
+        return state["sum"] / min(state["count"], self.n)
+
+    def update(self, state, side, x):
+        # The ring buffer slot being overwritten drops out of the window
+        state["sum"] += x - state["buffer"][state["pos"]]
+        state["buffer"][state["pos"]] = x
+        state["pos"] = (state["pos"] + 1) % self.n
+        state["count"] += 1
+
+    def batch(self, played, x, keys, side):
+        # Post-game window sums from cumulative sums over played rows
+        done = pd.Series(x[played])
+        done_keys = [key[played] for key in keys]
+        cumsum = done.groupby(done_keys).cumsum()
+        window = cumsum - cumsum.groupby(done_keys).shift(self.n).fillna(0.0)
+        count = done.groupby(done_keys).cumcount() + 1
+        post_game = window.to_numpy() / np.minimum(count.to_numpy(), self.n)
+        return pregame_values(post_game, played, keys, DEFAULTS[self.stat])
+
+
+class EWM:
+    def __init__(self, stat, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"EWM alpha must be in (0, 1], got {alpha}")
+        self.stat, self.alpha = stat, alpha
+        self.name = f"ewm{alpha:g}_{stat}"
+
+    def new_state(self):
+        return {"value": None}
+
+    def value(self, state, side):
+        return DEFAULTS[self.stat] if state["value"] is None else state["value"]
+
+    def update(self, state, side, x):
+        state["value"] = x if state["value"] is None else (1 - self.alpha) * state["value"] + self.alpha * x
+
+    def batch(self, played, x, keys, side):
+        # The same recurrence, stepped across all teams at once
+        done = pd.Series(x[played])
+        done_keys = [key[played] for key in keys]
+        group = done.groupby(done_keys).ngroup().to_numpy()
+        step = done.groupby(done_keys).cumcount().to_numpy()
+        values = done.to_numpy()
+
+        result = np.empty(len(values))
+        current = np.zeros(group.max() + 1 if len(group) else 0)
+        order = np.argsort(step, kind="stable")
+        bounds = np.searchsorted(step[order], np.arange(step.max() + 2 if len(step) else 1))
+        for s in range(len(bounds) - 1):
+            rows = order[bounds[s]:bounds[s + 1]]
+            g = group[rows]
+            current[g] = values[rows] if s == 0 else (1 - self.alpha) * current[g] + self.alpha * values[rows]
+            result[rows] = current[g]
+        return pregame_values(result, played, keys, DEFAULTS[self.stat])
+
+
+class HomeAwaySplit:
+    def __init__(self, stat):
+        self.stat = stat
+        self.name = f"split_{stat}"
+
+    def new_state(self):
+        return {"home": [0, 0.0], "away": [0, 0.0]}
+
+    def value(self, state, side):
+        games, total = state[side]
+        return total / games if games else DEFAULTS[self.stat]
+
+    def update(self, state, side, x):
+        state[side][0] += 1
+        state[side][1] += x
+
+    def batch(self, played, x, keys, side):
+        # Running totals per (season, team, side) minus the current row
+        split_keys = [*keys, side]
+        x = np.where(played, x, 0.0)
+        games = pd.Series(played.astype(int)).groupby(split_keys).cumsum().to_numpy() - played
+        total = pd.Series(x).groupby(split_keys).cumsum().to_numpy() - x
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(games > 0, total / np.maximum(games, 1), DEFAULTS[self.stat])
+
+
+SPEC_PATTERNS = [
+    (re.compile(r"last(\d+)_(win|run_diff)$"), lambda m: LastN(m.group(2), int(m.group(1)))),
+    (re.compile(r"ewm([0-9.]+)_(win|run_diff)$"), lambda m: EWM(m.group(2), float(m.group(1)))),
+    (re.compile(r"split_(win|run_diff)$"), lambda m: HomeAwaySplit(m.group(1))),
+]
+
+
+def parse_specs(specs):
+    """Updaters for a list of spec strings; raises ValueError on unknown specs."""
+    updaters = []
+    for spec in specs:
+        for pattern, make in SPEC_PATTERNS:
+            match = pattern.match(spec)
+            if match:
+                updaters.append(make(match))
+                break
+        else:
+            raise ValueError(f"Unknown rolling feature {spec!r}")
+    names = [updater.name for updater in updaters]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate rolling features in {specs}")
+    return updaters
+
+
+def feature_columns(updaters):
+    return [f"{side}_{updater.name}" for updater in updaters for side in ("home", "away")]
+
+
+class RollingTracker:
+    """
+    Loop path: per (season, team) updater state, advanced one game at a
+    time. Serializes to JSON for the team state checkpoint.
+    """
+
+    def __init__(self, updaters, teams=None):
+        self.updaters = updaters
+        self.teams = teams or {}  # {season: {team: {updater name: state}}}
+
+    def team(self, season, team):
+        states = self.teams.setdefault(int(season), {})
+        if team not in states:
+            states[team] = {updater.name: updater.new_state() for updater in self.updaters}
+        return states[team]
+
+    def features(self, df, long=None):
+        """Pre-game rolling features for a schedule, updating the state with its completed games."""
+        columns = {column: np.empty(len(df)) for column in feature_columns(self.updaters)}
+        played = (df["Status"] != "Scheduled").to_numpy()
+        seasons = df["Date"].dt.year.to_numpy()
+        rows = zip(df["Home"], df["Away"], df["home_win"], df["Home Score"], df["Away Score"])
+        for i, (home, away, home_win, home_score, away_score) in enumerate(rows):
+            sides = {"home": self.team(seasons[i], home), "away": self.team(seasons[i], away)}
+            for updater in self.updaters:
+                for side, state in sides.items():
+                    columns[f"{side}_{updater.name}"][i] = updater.value(state[updater.name], side)
+            if played[i]:
+                for side, state, win, scored, allowed in [
+                    ("home", sides["home"], home_win, home_score, away_score),
+                    ("away", sides["away"], 1 - home_win, away_score, home_score),
+                ]:
+                    for updater in self.updaters:
+                        updater.update(state[updater.name], side, game_value(updater.stat, win, scored, allowed))
+        return pd.DataFrame(columns, index=df.index)
+
+    def to_json(self, latest_only=True):
+        seasons = [max(self.teams)] if latest_only and self.teams else list(self.teams)
+        return {
+            "specs": [updater.name for updater in self.updaters],
+            "teams": {str(season): self.teams[season] for season in seasons},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(parse_specs(data["specs"]), {int(season): teams for season, teams in data["teams"].items()})
+
+    def copy(self):
+        return RollingTracker(self.updaters, copy.deepcopy(self.teams))
+
+
+class RollingBatch:
+    """Batch path, for building a whole schedule from scratch."""
+
+    def __init__(self, updaters):
+        self.updaters = updaters
+
+    def features(self, df, long):
+        if (long["side"] == "seed").any():
+            raise ValueError("The batch path can't continue from a team state, use a RollingTracker")
+        result = batch_rolling_features(long, self.updaters)
+        result.index = df.index
+        return result
+
+
+def batch_rolling_features(long, updaters):
+    """
+    Batch path: pre-game rolling features for every row of a team-game
+    table from team_game_table() (without seed rows), returned as a frame
+    indexed like the game rows with home_/away_ columns.
+    """
+    played = long["played"].to_numpy()
+    keys = [long["season"].to_numpy(), long["team"].to_numpy()]
+    side = long["side"].to_numpy()
+    scored, allowed = long["runs_scored"].to_numpy(), long["runs_allowed"].to_numpy()
+
+    result = {}
+    for updater in updaters:
+        x = np.where(long["win"].to_numpy() == 1, 1.0, 0.0) if updater.stat == "win" else (scored - allowed).astype(float)
+        values = updater.batch(played, x, keys, side)
+        for s in ("home", "away"):
+            mask = side == s
+            result[f"{s}_{updater.name}"] = pd.Series(values[mask], index=long.loc[mask, "game"].to_numpy())
+    return pd.DataFrame(result).sort_index()[feature_columns(updaters)]
@@ -0,0 +1,384 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import metrics
+
+# Fallback values used before a team has played a game
+DEFAULT_WIN_PCT = 0.5
+DEFAULT_RUNS_PG = 4.5
+LAST_N = 10
+# Starters with no stats (or no earlier start this season, for as-of stats)
+DEFAULT_PITCHER_STATS = {"era": 4.25, "whip": 1.35}
+
+FEATURE_COLUMNS = [
+    "date", "home_team", "away_team", "home_starter", "away_starter",
+    "home_win_pct", "away_win_pct", "home_last10_win_pct", "away_last10_win_pct",
+    "home_runs_pg", "away_runs_pg", "home_runs_allowed_pg", "away_runs_allowed_pg",
+    "home_pitcher_era", "away_pitcher_era", "home_pitcher_whip", "away_pitcher_whip",
+    "home_score", "away_score", "target",
+]
+
+TEAM_STAT_COLUMNS = ["win_pct", "last10_win_pct", "runs_pg", "runs_allowed_pg"]
+
+
+def prepare_schedule(df):
+    """Parse dates and add the home_win column to as-played rows."""
+    df["Date"] = pd.to_datetime(df["Date"])
+
+    # Add home_win column for completed games
+    df["home_win"] = (df["Home Score"] > df["Away Score"]).astype(int)
+    return df
+
+
+def load_schedule(paths):
+    """Read one or more as-played CSVs into a single chronologically sorted frame."""
+    if isinstance(paths, str):
+        paths = [paths]
+    seasons = []
+    for path in paths:
+        season_df = pd.read_csv(path)
+
+        # Convert dates to datetime and sort chronologically. The sort is
+        # stable so games on the same date keep file order, which puts
+        # doubleheader game 1 first and matches iter_schedule_chunks()
+        season_df["Date"] = pd.to_datetime(season_df["Date"])
+        seasons.append(season_df.sort_values("Date", kind="stable"))
+
+    # A stable merge keeps each file's own game order, so a season built
+    # alongside others gets exactly the rows it gets when built alone
+    df = pd.concat(seasons, ignore_index=True)
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    return prepare_schedule(df)
+
+
+def iter_schedule_chunks(paths, chunksize=50_000):
+    """
+    Yield the games of one or more as-played CSVs in chunks of about
+    `chunksize` rows without loading whole files. A date is never split
+    across chunks. Files are read in the order given and must already be
+    in date order, as the as-played exports are; games keep file order.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    carry = None
+    for path in paths:
+        for raw in pd.read_csv(path, chunksize=chunksize):
+            raw["Date"] = pd.to_datetime(raw["Date"])
+            chunk = raw if carry is None else pd.concat([carry, raw], ignore_index=True)
+            if not chunk["Date"].is_monotonic_increasing:
+                raise ValueError(f"{path} is not in date order; build it without streaming")
+
+            # Hold back the last date, it may continue in the next chunk
+            last_date = chunk["Date"] == chunk["Date"].iloc[-1]
+            carry = chunk[last_date]
+            ready = chunk[~last_date]
+            if not ready.empty:
+                yield prepare_schedule(ready.reset_index(drop=True))
+
+    if carry is not None and not carry.empty:
+        yield prepare_schedule(carry.reset_index(drop=True))
+
+
+def team_game_table(df, state=None):
+    """
+    Turn a schedule (one row per game) into a long table with one row per
+    team per game. Rows keep the schedule order so grouped cumulative sums
+    see games in the same order the original loop did.
+
+    If a saved team state is given, seed rows carrying each team's running
+    totals and last-10 results are put in front of the games.
+    """
+    played = (df["Status"] != "Scheduled").to_numpy()
+    home_win = df["home_win"].to_numpy()
+    season = df["Date"].dt.year.to_numpy()
+    game = np.arange(len(df))
+
+    sides = []
+    for side, team_col, win, scored_col, allowed_col in [
+        ("home", "Home", home_win, "Home Score", "Away Score"),
+        ("away", "Away", 1 - home_win, "Away Score", "Home Score"),
+    ]:
+        runs_scored = df[scored_col].to_numpy()
+        runs_allowed = df[allowed_col].to_numpy()
+        sides.append(pd.DataFrame({
+            "game": game,
+            "side": side,
+            "season": season,
+            "team": df[team_col].to_numpy(),
+            "played": played,
+            "win": win,
+            # What this row adds to the team's running totals
+            "games": played.astype(int),
+            "wins": np.where(played, win, 0),
+            "runs_scored": np.where(played, runs_scored, 0),
+            "runs_allowed": np.where(played, runs_allowed, 0),
+        }))
+
+    if state:
+        sides.insert(0, seed_rows(state))
+
+    long = pd.concat(sides, ignore_index=True)
+    return long.sort_values(["game", "side"], kind="stable").reset_index(drop=True)
+
+
+def seed_rows(state):
+    """Rows that replay a saved team state in front of a team-game table."""
+    rows = []
+    for season, teams in state.items():
+        for team, record in teams.items():
+            # One row carries the season totals, the rest rebuild the last-10 window
+            rows.append({
+                "season": int(season), "team": team, "played": False, "win": 0,
+                "games": record["games"], "wins": record["wins"],
+                "runs_scored": record["runs_scored"], "runs_allowed": record["runs_allowed"],
+            })
+            for result in record["last10"]:
+                rows.append({
+                    "season": int(season), "team": team, "played": True, "win": result,
+                    "games": 0, "wins": 0, "runs_scored": 0, "runs_allowed": 0,
+                })
+
+    seed = pd.DataFrame(rows, columns=["season", "team", "played", "win", "games", "wins", "runs_scored", "runs_allowed"])
+    seed.insert(0, "game", -1)
+    seed.insert(1, "side", "seed")
+    return seed
+
+
+def pregame_team_stats(long):
+    """
+    Add pre-game win %, last-10 win % and runs scored/allowed per game to a
+    team-game table. Stats only include completed games that came before the
+    row, matching the running totals the original loop kept per team.
+    """
+    keys = [long["season"], long["team"]]
+
+    # Pre-game totals = running total up to and including this row minus this row
+    totals = {}
+    for col in ["games", "wins", "runs_scored", "runs_allowed"]:
+        totals[col] = long[col].groupby(keys).cumsum() - long[col]
+    games = totals["games"]
+
+    has_games = games > 0
+    long["win_pct"] = (totals["wins"] / games).where(has_games, DEFAULT_WIN_PCT)
+    long["runs_pg"] = (totals["runs_scored"] / games).where(has_games, DEFAULT_RUNS_PG)
+    long["runs_allowed_pg"] = (totals["runs_allowed"] / games).where(has_games, DEFAULT_RUNS_PG)
+
+    # Last-10 form: rolling window over completed games only, then carried
+    # forward to the following rows (including scheduled games) of that team
+    done = long[long["played"]]
+    done_keys = [done["season"], done["team"]]
+    window_sum = done["win"].groupby(done_keys).rolling(LAST_N, min_periods=1).sum()
+    window_len = done["win"].groupby(done_keys).rolling(LAST_N, min_periods=1).count()
+    post_game = (window_sum / window_len).reset_index(level=[0, 1], drop=True)
+
+    last10 = post_game.reindex(long.index)
+    last10 = last10.groupby(keys).shift(1)
+    last10 = last10.groupby(keys).ffill()
+    long["last10_win_pct"] = last10.fillna(DEFAULT_WIN_PCT)
+    return long
+
+
+def team_state(df, state=None):
+    """
+    Running per-team state (games, wins, runs, last-10 results) after every
+    completed game in df, starting from an optional earlier state.
+    Returned as {season: {team: record}}.
+    """
+    long = team_game_table(df, state)
+    by_team = long.groupby(["season", "team"])
+    totals = by_team[["games", "wins", "runs_scored", "runs_allowed"]].sum()
+    done = long[long["played"]]
+    last10 = done.groupby(["season", "team"]).tail(LAST_N).groupby(["season", "team"])["win"].agg(list)
+
+    result = {}
+    for (season, team), record in totals.iterrows():
+        result.setdefault(int(season), {})[team] = {
+            "games": int(record["games"]),
+            "wins": int(record["wins"]),
+            "runs_scored": float(record["runs_scored"]),
+            "runs_allowed": float(record["runs_allowed"]),
+            "last10": [int(x) for x in last10.get((season, team), [])],
+        }
+    return result
+
+
+def last_completed_date(df):
+    """Latest date on or before which every game in df is final (None if none)."""
+    scheduled = df.loc[df["Status"] == "Scheduled", "Date"]
+    completed = df["Date"] if scheduled.empty else df.loc[df["Date"] < scheduled.min(), "Date"]
+    return None if completed.empty else completed.max()
+
+
+def load_team_state(path):
+    """Read a team-state checkpoint written by save_team_state()."""
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+    return {
+        "as_of": pd.Timestamp(checkpoint["as_of"]),
+        "teams": {int(season): teams for season, teams in checkpoint["teams"].items()},
+        # RollingTracker.to_json() output, if the build had rolling features
+        "rolling": checkpoint.get("rolling"),
+        "pitcher_stats": checkpoint.get("pitcher_stats", "season"),
+    }
+
+
+def save_team_state(path, as_of, state, rolling=None, pitcher_stats="season"):
+    """Write the running team state as of a date, replacing the file atomically."""
+    # Only the latest season can still change
+    latest = max(state) if state else None
+    checkpoint = {
+        "as_of": as_of.strftime("%Y-%m-%d"),
+        "teams": {str(season): teams for season, teams in state.items() if season == latest},
+    }
+    if rolling is not None:
+        checkpoint["rolling"] = rolling.to_json()
+    if pitcher_stats != "season":
+        checkpoint["pitcher_stats"] = pitcher_stats
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def build_features(df, pitcher_stat=None, state=None, rolling=None, pitcher_history=None):
+    """
+    Build the model feature table for a schedule loaded by load_schedule().
+
+    pitcher_stat(player_name, stat, season) returns a pitcher's season stat
+    (or None); it is called once per unique starter and season. state is a
+    team state from team_state() that the schedule continues from.
+
+    rolling adds the optional columns of features/rolling.py after
+    FEATURE_COLUMNS: a RollingBatch for a build from scratch, or a
+    RollingTracker to continue from (advanced past df's completed games).
+
+    pitcher_history, from pregame_pitcher_stats(), replaces the season
+    stats of pitcher_stat with each starter's stats before the game.
+    """
+    long = pregame_team_stats(team_game_table(df, state))
+
+    features = pd.DataFrame({
+        "date": df["Date"],
+        "home_team": df["Home"],
+        "away_team": df["Away"],
+        "home_starter": df.get("Home Starter"),
+        "away_starter": df.get("Away Starter"),
+    })
+
+    # Pivot per-team stats back onto the game rows as home_/away_ columns
+    for side in ["home", "away"]:
+        side_stats = long[long["side"] == side].set_index("game")
+        for col in TEAM_STAT_COLUMNS:
+            features[f"{side}_{col}"] = side_stats[col].to_numpy()
+
+    if pitcher_history is not None:
+        features = add_pitcher_stats_as_of(features, pitcher_history)
+    else:
+        features = add_pitcher_stats(features, pitcher_stat)
+
+    # Floats even in a chunk without scheduled (NaN) scores, so every build writes 4.0, not 4
+    features["home_score"] = df["Home Score"].astype(float)
+    features["away_score"] = df["Away Score"].astype(float)
+    # Target: 1/0 for played games, -1 for scheduled
+    features["target"] = df["home_win"].where(df["Status"] != "Scheduled", -1)
+
+    features = features[FEATURE_COLUMNS].copy()
+    if rolling is not None:
+        features = pd.concat([features, rolling.features(df, long)], axis=1)
+
+    # Fill NaNs only for numeric columns
+    numeric_cols = features.select_dtypes(include="number").columns
+    features[numeric_cols] = features[numeric_cols].fillna(0.5)
+    return features
+
+
+def starters_by_season(df):
+    """Unique starting pitchers in a schedule, as {season: set of names}."""
+    season = df["Date"].dt.year.astype(str)
+    starters = pd.concat([
+        pd.DataFrame({"name": df["Home Starter"], "season": season}),
+        pd.DataFrame({"name": df["Away Starter"], "season": season}),
+    ]).dropna()
+    return {year: set(group["name"]) for year, group in starters.groupby("season")}
+
+
+def add_pitcher_stats(features, pitcher_stat=None):
+    """Attach starter ERA/WHIP, looking each (starter, season) pair up once."""
+    defaults = DEFAULT_PITCHER_STATS
+    season = features["date"].dt.year.astype(str)
+
+    starters = pd.concat([
+        pd.DataFrame({"name": features["home_starter"], "season": season}),
+        pd.DataFrame({"name": features["away_starter"], "season": season}),
+    ]).dropna().drop_duplicates()
+    unique_keys = list(starters.itertuples(index=False, name=None))
+
+    for stat, default in defaults.items():
+        lookup = {}
+        if pitcher_stat is not None:
+            lookup = {key: pitcher_stat(key[0], stat, key[1]) for key in unique_keys}
+            # Starters without a value end up filled with a constant downstream
+            metrics.count(f"starters_missing_{stat}", sum(value is None for value in lookup.values()))
+
+        for side in ["home", "away"]:
+            starter = features[f"{side}_starter"]
+            values = [
+                lookup.get((name, year), default) if pd.notna(name) else default
+                for name, year in zip(starter, season)
+            ]
+            features[f"{side}_pitcher_{stat}"] = pd.to_numeric(pd.Series(values, index=features.index, dtype=object))
+    return features
+
+
+def pregame_pitcher_stats(logs):
+    """
+    Season-to-date ERA and WHIP after every appearance in a game log frame
+    (from get_stats.pitcher_game_logs()), from grouped cumulative sums.
+    Returns player, season, date, era, whip rows sorted by date, one per
+    pitcher and date, ready for add_pitcher_stats_as_of().
+    """
+    logs = logs.sort_values(["player", "season", "date", "game_pk"], kind="stable")
+    keys = [logs["player"], logs["season"]]
+    outs = logs["outs"].groupby(keys).cumsum().to_numpy()
+    earned_runs = logs["earned_runs"].groupby(keys).cumsum().to_numpy()
+    baserunners = (logs["hits"] + logs["walks"]).groupby(keys).cumsum().to_numpy()
+
+    # No outs recorded yet leaves the stats undefined (filled with defaults)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        history = pd.DataFrame({
+            "player": logs["player"].array,
+            "season": logs["season"].array,
+            "date": logs["date"].to_numpy().astype("datetime64[ns]"),
+            "era": np.where(outs > 0, 27 * earned_runs / outs, np.nan),
+            "whip": np.where(outs > 0, 3 * baserunners / outs, np.nan),
+        })
+    # Two appearances on one date: the later one holds the day's totals
+    history = history.drop_duplicates(["player", "season", "date"], keep="last")
+    return history.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+def add_pitcher_stats_as_of(features, history):
+    """
+    Attach each starter's ERA/WHIP over their appearances before the game
+    date with a sorted as-of join on (starter, season, date), so no game
+    sees stats from its own or later games.
+    """
+    season = features["date"].dt.year.astype(str).to_numpy()
+    for side in ["home", "away"]:
+        starts = pd.DataFrame({
+            "player": features[f"{side}_starter"].to_numpy(),
+            "season": season,
+            "date": features["date"].to_numpy().astype("datetime64[ns]"),
+            "row": np.arange(len(features)),
+        }).dropna(subset=["player"]).sort_values("date", kind="stable")
+        joined = pd.merge_asof(starts, history, on="date", by=["player", "season"], allow_exact_matches=False)
+
+        metrics.count("starters_without_history", int(joined["era"].isna().sum()))
+        for stat, default in DEFAULT_PITCHER_STATS.items():
+            values = np.full(len(features), default)
+            values[joined["row"].to_numpy()] = joined[stat].fillna(default).to_numpy()
+            features[f"{side}_pitcher_{stat}"] = values
+    return features
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Single entry point for the MLB predictor:
+
+    python mlb.py features [--incremental]
+    python mlb.py train [--no-plot]
+    python mlb.py predict-game --home yankees --away mets
+    python mlb.py predict-day --date 2025-07-04
+    python mlb.py matchups [--home yankees --away mets --home-starters ...]
+    python mlb.py simulate --simulations 100000
+    python mlb.py serve
+    python mlb.py pipeline [--dry-run] [--force train]
+
+Arguments after the subcommand go to the underlying script. This file only
+imports the standard library; each script loads pandas, xgboost, statsapi,
+matplotlib etc. itself, and only when the subcommand needs them. Options
+before the subcommand:
+
+    --timings          import times and per-stage metrics on stderr
+    --report run.json  per-stage wall/CPU time, rows/s, API call latencies,
+                       cache hit ratios and counters as JSON
+    --profile run.prof cProfile dump of the whole run (see pstats)
+"""
+import argparse
+import builtins
+import os
+import runpy
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from utils.instrumentation import metrics, profiled
+
+COMMANDS = {
+    "features": ("features/feature_engineering.py", "Build the feature table from as-played schedules"),
+    "train": ("models/train_model.py", "Train the game outcome model"),
+    "predict-game": ("scripts/predict_game.py", "Predict one scheduled game"),
+    "predict-day": ("scripts/predict_day.py", "Predict every game on a day or date range"),
+    "matchups": ("scripts/predict_matchups.py", "What-if grid of every matchup, or starter combinations for one"),
+    "simulate": ("scripts/predict_season.py", "Simulate the rest of the season"),
+    "serve": ("scripts/prediction_service.py", "Run the prediction service"),
+    "pipeline": ("scripts/run_pipeline.py", "Run features, training and predictions, skipping unchanged stages"),
+}
+
+
+class ImportTimer:
+    """
+    Times every top-level import made while active. Each module's time
+    includes everything it imports in turn.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self.depth = 0
+
+    def __enter__(self):
+        self.original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if self.depth or level or name in sys.modules:
+                self.depth += 1
+                try:
+                    return self.original_import(name, globals, locals, fromlist, level)
+                finally:
+                    self.depth -= 1
+
+            start = time.perf_counter()
+            self.depth += 1
+            try:
+                return self.original_import(name, globals, locals, fromlist, level)
+            finally:
+                self.depth -= 1
+                self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
+
+        builtins.__import__ = timed_import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self.original_import
+        return False
+
+    def report(self, total, top=15, file=sys.stderr):
+        imports = sum(self.times.values())
+        print(f"\nImport timings ({len(self.times)} top-level imports, {imports * 1000:.0f} ms of {total * 1000:.0f} ms total):", file=file)
+        for name, seconds in sorted(self.times.items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"  {name:30} {seconds * 1000:8.1f} ms", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="mlb", description="MLB game predictor")
+    parser.add_argument("--timings", action="store_true", help="Report import times and run metrics to stderr")
+    parser.add_argument("--report", type=str, default=None, help="Write the run metrics to this JSON file")
+    parser.add_argument("--profile", type=str, default=None, help="Write a cProfile dump of the run to this file")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (_, help_text) in COMMANDS.items():
+        # Each script parses (and documents) its own options
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    script = os.path.join(ROOT, COMMANDS[args.command][0])
+    sys.argv = [script] + rest
+
+    start = time.perf_counter()
+    timer = ImportTimer()
+    try:
+        with timer if args.timings else _nullcontext(), profiled(args.profile):
+            runpy.run_path(script, run_name="__main__")
+    finally:
+        if args.timings:
+            timer.report(time.perf_counter() - start)
+            metrics.print_summary()
+        if args.report:
+            metrics.write_report(args.report)
+
+
+class _nullcontext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if __name__ == "__main__":
+    main()
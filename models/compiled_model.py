@@ -0,0 +1,244 @@
+import os
+
+import numpy as np
+
+from utils.instrumentation import metrics
+
+# Array export of the (scaler, model) pickle, written next to it
+COMPILED_SUFFIX = ".npz"
+
+
+def _exp2_table(bits=5):
+    """glibc's 2^(i/N) table, less the exponent bits added back in _expf()."""
+    from decimal import Decimal, getcontext
+
+    getcontext().prec = 40
+    n = 1 << bits
+    values = np.array([float(Decimal(2) ** (Decimal(i) / n)) for i in range(n)])
+    return values.view(np.uint64) - (np.arange(n, dtype=np.uint64) << np.uint64(52 - bits))
+
+
+_EXP2F_BITS = 5
+_EXP2F_TABLE = _exp2_table(_EXP2F_BITS)
+_EXPF_SHIFT = float.fromhex("0x1.8p+52")
+_EXPF_INVLN2_SCALED = float.fromhex("0x1.71547652b82fep+0") * (1 << _EXP2F_BITS)
+_EXPF_POLY_SCALED = (
+    float.fromhex("0x1.c6af84b912394p-5") / (1 << _EXP2F_BITS) ** 3,
+    float.fromhex("0x1.ebfce50fac4f3p-3") / (1 << _EXP2F_BITS) ** 2,
+    float.fromhex("0x1.62e42ff0c52d6p-1") / (1 << _EXP2F_BITS),
+)
+
+
+def _expf(x):
+    """
+    Vectorized port of glibc's expf, which XGBoost's sigmoid calls. It is
+    not always correctly rounded, so np.exp (float32 or float64) disagrees
+    with it on about 1 value in 5000.
+    """
+    xd = np.asarray(x, dtype=np.float32).astype(np.float64)
+    z = _EXPF_INVLN2_SCALED * xd
+    kd = z + _EXPF_SHIFT
+    ki = kd.view(np.uint64)
+    kd = kd - _EXPF_SHIFT
+    r = z - kd
+    t = _EXP2F_TABLE[ki % np.uint64(1 << _EXP2F_BITS)] + (ki << np.uint64(52 - _EXP2F_BITS))
+    s = t.view(np.float64)
+    c0, c1, c2 = _EXPF_POLY_SCALED
+    y = (c0 * r + c1) * (r * r) + (c2 * r + 1)
+    y = (y * s).astype(np.float32)
+    # glibc's over/underflow handling
+    y[xd > float.fromhex("0x1.62e42ep6")] = np.inf
+    y[xd < -float.fromhex("0x1.9fe368p6")] = 0
+    return y
+
+
+def compiled_path(model_file):
+    return os.path.splitext(model_file)[0] + COMPILED_SUFFIX
+
+
+class ArrayScaler:
+    """StandardScaler.transform from the exported mean and scale."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class ArrayBooster:
+    """
+    Evaluates an exported binary:logistic XGBoost model with NumPy only.
+
+    Every tree is padded to a complete binary tree of the model's depth (a
+    leaf above the bottom level sends every row left, down to a copy of
+    itself), stored as (trees, nodes) arrays. Node p's children are then
+    2p + 1 and 2p + 2, so all rows walk all trees at once with one gather
+    per level. Inputs are cast to float32 and leaf values are summed tree
+    by tree in float32 on top of the base margin, the same way XGBoost's
+    CPU predictor does, so probabilities match predict_proba bit for bit.
+    """
+
+    def __init__(self, feature, threshold, default_left, value, base_margin):
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.base_margin = base_margin
+        self.n_trees, n_nodes = feature.shape
+        self.depth = int(np.log2(n_nodes + 1)) - 1
+        self.tree_base = (np.arange(self.n_trees, dtype=np.int32) * n_nodes)[:, None]
+
+    def predict_margin(self, X, block_rows=4096):
+        X = np.asarray(X, dtype=np.float32)
+        margin = np.full(len(X), self.base_margin, dtype=np.float32)
+        feature = self.feature.ravel()
+        threshold = self.threshold.ravel()
+        default_left = self.default_left.ravel()
+        value = self.value.ravel()
+
+        # Row blocks bound the (trees x rows) matrices
+        for start in range(0, len(X), block_rows):
+            columns = np.ascontiguousarray(X[start:start + block_rows].T)
+            n = columns.shape[1]
+            has_missing = np.isnan(columns).any()
+
+            # The root level needs no gathers: one feature row per tree
+            fvalue = columns[self.feature[:, 0]]
+            go_left = fvalue < self.threshold[:, :1]
+            if has_missing:
+                go_left = np.where(np.isnan(fvalue), self.default_left[:, :1], go_left)
+            pos = 2 - go_left.astype(np.int32)
+
+            row_offsets = np.arange(n, dtype=np.int32)
+            flat_columns = columns.ravel()
+            for _ in range(1, self.depth):
+                node = self.tree_base + pos
+                fvalue = np.take(flat_columns, np.take(feature, node) * n + row_offsets)
+                go_left = fvalue < np.take(threshold, node)
+                if has_missing:
+                    go_left = np.where(np.isnan(fvalue), np.take(default_left, node), go_left)
+                pos = 2 * pos + 2 - go_left
+
+            # Tree order matters for float32 rounding, so no pairwise np.sum
+            block_margin = margin[start:start + n]
+            for tree_values in np.take(value, self.tree_base + pos):
+                block_margin += tree_values
+        return margin
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+        one = np.float32(1)
+        # XGBoost's sigmoid, including its clamp
+        prob = one / (_expf(np.minimum(-margin, np.float32(88.7))) + one)
+        return np.column_stack([one - prob, prob])
+
+    def predict(self, X):
+        # XGBClassifier's binary rule: class 1 only above 0.5
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+
+def _tree_depth(tree):
+    parents = tree["parents"]
+    depth = [0] * len(parents)
+    for node in range(1, len(parents)):
+        depth[node] = depth[parents[node]] + 1
+    return max(depth)
+
+
+def export_model(scaler, model, path):
+    """
+    Write the scaler's mean/scale and the booster's trees to an .npz file
+    that load_compiled() can evaluate without xgboost or scikit-learn.
+    """
+    import json
+
+    learner = json.loads(model.get_booster().save_raw(raw_format="json"))["learner"]
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError(f"Can only export binary:logistic models, not {learner['objective']['name']}")
+
+    trees = learner["gradient_booster"]["model"]["trees"]
+    try:
+        # Early-stopped models predict with the trees up to the best round
+        trees = trees[:model.best_iteration + 1]
+    except AttributeError:
+        pass
+    depth = max(_tree_depth(tree) for tree in trees)
+    n_nodes = 2 ** (depth + 1) - 1
+    bottom = 2 ** depth - 1  # first position on the leaf level
+
+    feature = np.zeros((len(trees), n_nodes), dtype=np.int32)
+    threshold = np.full((len(trees), n_nodes), np.inf, dtype=np.float32)
+    default_left = np.ones((len(trees), n_nodes), dtype=bool)
+    value = np.zeros((len(trees), n_nodes), dtype=np.float32)
+
+    for t, tree in enumerate(trees):
+        stack = [(0, 0)]  # (XGBoost node id, padded position)
+        while stack:
+            node, pos = stack.pop()
+            if pos >= bottom:
+                # XGBoost keeps a leaf's value in split_conditions
+                value[t, pos] = tree["split_conditions"][node]
+            elif tree["left_children"][node] == -1:
+                # Leaf above the bottom level: threshold inf and default left
+                # send every row left, towards a copy of this leaf
+                stack.append((node, 2 * pos + 1))
+            else:
+                feature[t, pos] = tree["split_indices"][node]
+                threshold[t, pos] = tree["split_conditions"][node]
+                default_left[t, pos] = bool(tree["default_left"][node])
+                stack.append((tree["left_children"][node], 2 * pos + 1))
+                stack.append((tree["right_children"][node], 2 * pos + 2))
+
+    # base_score is stored as a probability, e.g. "[5.3951275E-1]"
+    base_score = np.float32(float(learner["learner_model_param"]["base_score"].strip("[]")))
+    # XGBoost takes logf of a float32; rounding a float64 log once matches
+    # it where float32 np.log can be an ulp off
+    base_margin = -np.float32(np.log(np.float64(np.float32(1) / base_score - np.float32(1))))
+
+    tmp_path = path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        feature=feature,
+        threshold=threshold,
+        default_left=default_left,
+        value=value,
+        base_margin=np.float32(base_margin),
+    )
+    os.replace(tmp_path, path)
+
+
+def load_compiled(path):
+    """(ArrayScaler, ArrayBooster) pair from an export_model() file."""
+    with np.load(path) as arrays:
+        arrays = dict(arrays)
+    scaler = ArrayScaler(arrays.pop("mean"), arrays.pop("scale"))
+    return scaler, ArrayBooster(**arrays)
+
+
+def verify(scaler, model, compiled_scaler, compiled_model, X):
+    """Largest absolute difference between the original and compiled home win probabilities."""
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    actual = compiled_model.predict_proba(compiled_scaler.transform(X))[:, 1]
+    return float(np.max(np.abs(expected.astype(np.float64) - actual.astype(np.float64)), initial=0.0))
+
+
+def load_model(model_file):
+    """
+    (scaler, model) pair for a model pickle. Uses its array export when
+    that is at least as new, which avoids importing xgboost and
+    scikit-learn; otherwise unpickles the original.
+    """
+    path = compiled_path(model_file)
+    compiled = os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(model_file)
+    metrics.cache("compiled_model", compiled)
+    with metrics.stage("load_model"):
+        if compiled:
+            return load_compiled(path)
+
+        import joblib
+
+        return joblib.load(model_file)
@@ -1,70 +1,360 @@
-import pandas as pd
+import argparse
+import json
+import os
+import shutil
+import sys
+
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import joblib
+import numpy as np
+import pandas as pd
+
+# Allow running as `python models/train_model.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from features.compact import load_compact
+from utils.instrumentation import metrics
+
+MODEL_FILE = "models/logreg_with_scaler.pkl"
+# Version, training window and warm-start history of MODEL_FILE
+META_FILE = "models/logreg_with_scaler.json"
+# Earlier versions of the model, newest KEEP_VERSIONS kept
+VERSIONS_DIR = "models/versions"
+KEEP_VERSIONS = 5
+
+# Boosting rounds added per incremental update
+UPDATE_ROUNDS = 10
+# Full rebuild once warm starts have added this many rounds in total...
+MAX_ADDED_ROUNDS = 150
+# ...or once the games since the last full fit have drifted this many
+# standard deviations (of the fitted scaler) away on any feature's mean;
+# checked once there are enough games for the mean to be more than noise
+DRIFT_THRESHOLD = 0.5
+DRIFT_MIN_GAMES = 150
+
+MODEL_PARAMS = {
+    "n_estimators": 1200,
+    "learning_rate": 0.025,
+    "max_depth": 2,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "random_state": 42,
+    "eval_metric": "logloss",
+}
+
+
+def training_data(games):
+    """
+    Model inputs (a frame over the feature matrix, copied only to fill
+    missing values with 0.5) and the home-win target of completed
+    CompactFeatures.
+    """
+    x = games.feature_frame()
+    if np.isnan(games.values).any():
+        x = x.fillna(0.5)
+    return x, pd.Series(games.target, name="target")
+
+
+def final_games(games):
+    """
+    The games (CompactFeatures sorted by date) up to the last date on or
+    before which every game is final, as a view. Completed games after it
+    wait for a later fit, so a date that is only partly final is never
+    split between fits and trained_through always means "every game up to
+    here".
+    """
+    scheduled = games.date[games.target == -1]
+    end = len(games) if len(scheduled) == 0 else np.searchsorted(games.date, scheduled.min(), side="left")
+    held_back = int((games.target[end:] != -1).sum())
+    if held_back:
+        print(f"{held_back} completed games are left for a later fit: "
+              f"a game on {pd.Timestamp(scheduled.min()).date()} is not final yet.")
+    return games.take(slice(0, end))
+
+
+def fit(x, y, params=MODEL_PARAMS):
+    """Fit the scaler and XGBoost model on every game in x. Returns (scaler, model)."""
+    import xgboost as xgb
+
+    # Optional: scale features (helps some models)
+    scaler = StandardScaler()
+    x_scaled = scaler.fit_transform(x)
+
+    # Initialize and train model
+    model = xgb.XGBClassifier(**params)
+    model.fit(x_scaled, y)
+    return scaler, model
+
+
+def train(x, y, params=MODEL_PARAMS):
+    """
+    Fit the scaler and XGBoost model on the first 80% of the games and hold
+    out the most recent 20%, so no future games leak into training. x and y
+    must be sorted by date.
+    Returns (scaler, model, X_test_scaled, y_test).
+    """
+    X_train, X_test, y_train, y_test = train_test_split(x, y, test_size=0.2, shuffle=False)
+    scaler, model = fit(X_train, y_train, params)
+    return scaler, model, scaler.transform(X_test), y_test
+
+
+def load_meta(meta_file=META_FILE):
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file, "r") as f:
+        return json.load(f)
+
+
+def export_compiled(scaler, model, x, model_file=MODEL_FILE):
+    """
+    Write the NumPy-only export of the model next to its pickle and check it
+    reproduces predict_proba on x; a mismatching export is removed so
+    loaders fall back to the pickle.
+    """
+    from models.compiled_model import compiled_path, export_model, load_compiled, verify
+
+    path = compiled_path(model_file)
+    export_model(scaler, model, path)
+    compiled_scaler, compiled_model = load_compiled(path)
+    difference = verify(scaler, model, compiled_scaler, compiled_model, x)
+    if difference != 0:
+        os.remove(path)
+        print(f"Compiled model differs from predict_proba by up to {difference:.3g}, not exported.")
+        return False
+    print(f"Exported {path} (identical to predict_proba on {len(x)} games)")
+    return True
+
+
+def save_model(scaler, model, meta, x=None, model_file=MODEL_FILE, meta_file=META_FILE):
+    """
+    Archive the current model under VERSIONS_DIR, then atomically replace
+    the (scaler, model) pickle and its metadata, and re-export the compiled
+    model (verified on x when given).
+    """
+    previous = load_meta(meta_file)
+    if previous is not None and os.path.exists(model_file):
+        os.makedirs(VERSIONS_DIR, exist_ok=True)
+        name, ext = os.path.splitext(os.path.basename(model_file))
+        shutil.copy2(model_file, os.path.join(VERSIONS_DIR, f"{name}.v{previous['version']}{ext}"))
+        archived = sorted(
+            (f for f in os.listdir(VERSIONS_DIR) if f.startswith(name + ".v")),
+            key=lambda f: int(f[len(name) + 2:-len(ext)]),
+        )
+        for old in archived[:-KEEP_VERSIONS]:
+            os.remove(os.path.join(VERSIONS_DIR, old))
+
+    meta = {**meta, "version": 1 if previous is None else previous["version"] + 1}
+    joblib.dump((scaler, model), model_file + ".tmp")
+    with open(meta_file + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(model_file + ".tmp", model_file)
+    os.replace(meta_file + ".tmp", meta_file)
+    export_compiled(scaler, model, x if x is not None else np.empty((0, len(scaler.mean_))), model_file)
+    return meta
+
+
+def feature_drift(scaler, x):
+    """Largest shift of a feature mean, in the scaler's standard deviations."""
+    if len(x) == 0:
+        return 0.0
+    return float(np.max(np.abs(x.to_numpy().mean(axis=0) - scaler.mean_) / scaler.scale_))
+
+
+def incremental_update(games, x, y, rounds=UPDATE_ROUNDS, params=MODEL_PARAMS):
+    """
+    Warm-start the saved model on the games completed since it was trained:
+    the scaler is kept and `rounds` more trees are boosted on the new games
+    only. The saved model must have been fit with `params`. Returns the new metadata, the old one if there was nothing new,
+    or None (with the reason printed) when a full rebuild is needed instead.
+    """
+    from sklearn.metrics import accuracy_score, log_loss
+
+    meta = load_meta()
+    if meta is None or not os.path.exists(MODEL_FILE):
+        print("No versioned model to warm-start from, doing a full rebuild.")
+        return None
+    if meta["features"] != list(x.columns):
+        print("Feature columns changed since the last fit, doing a full rebuild.")
+        return None
+    if meta["params"] != params:
+        print("Model parameters changed since the last fit, doing a full rebuild.")
+        return None
+
+    dates = pd.Series(games.date)
+    new = (dates > pd.Timestamp(meta["trained_through"])).to_numpy()
+    if not new.any():
+        print(f"No games completed after {meta['trained_through']}, model v{meta['version']} is current.")
+        return meta
+
+    scaler, model = joblib.load(MODEL_FILE)
+
+    since_full_fit = (dates > pd.Timestamp(meta["full_fit_through"])).to_numpy()
+    drift = feature_drift(scaler, x[since_full_fit]) if since_full_fit.sum() >= DRIFT_MIN_GAMES else 0.0
+    if drift > DRIFT_THRESHOLD:
+        print(f"Feature drift {drift:.2f} > {DRIFT_THRESHOLD} since the last full fit, doing a full rebuild.")
+        return None
+    if meta["added_rounds"] + rounds > MAX_ADDED_ROUNDS:
+        print(f"Warm starts would reach {meta['added_rounds'] + rounds} added rounds (> {MAX_ADDED_ROUNDS}), doing a full rebuild.")
+        return None
+
+    X_new = scaler.transform(x[new])
+    y_new = y[new]
+
+    # The new games are out of sample for the current model
+    probs = model.predict_proba(X_new)[:, 1]
+    print(f"{int(new.sum())} new games: log loss {log_loss(y_new, probs, labels=[0, 1]):.4f}, "
+          f"accuracy {accuracy_score(y_new, probs >= 0.5):.3f} before the update")
+
+    base_rounds = model.get_booster().num_boosted_rounds()
+    model.set_params(n_estimators=rounds)
+    with metrics.stage("warm_start", rows=len(y_new)):
+        model.fit(X_new, y_new, xgb_model=model.get_booster())
+
+    meta = save_model(scaler, model, {
+        **meta,
+        "mode": "incremental",
+        "trained_through": str(dates.max().date()),
+        "games": meta["games"] + int(new.sum()),
+        "added_rounds": meta["added_rounds"] + rounds,
+        "drift": drift,
+    }, x)
+    print(f"Model v{meta['version']}: {base_rounds} + {rounds} rounds, trained through {meta['trained_through']} "
+          f"({meta['added_rounds']} rounds added since the last full fit)")
+    return meta
+
+
+def walk_forward(games, x, y, args):
+    """
+    Score candidate parameters with time-ordered walk-forward folds, fitting
+    (candidate, fold) pairs in parallel. With --search every combination
+    (or --candidates of them) of the search space is tried and the best is
+    written to --best-params; otherwise only the current MODEL_PARAMS are.
+    """
+    from models.walk_forward import CACHE_DIR, candidate_grid, file_hash, prepare_folds, run_search, summarize
+
+    if args.search:
+        candidates = candidate_grid(args.candidates, seed=args.seed)
+    else:
+        candidates = [{key: value for key, value in MODEL_PARAMS.items() if key not in ("n_estimators", "random_state", "eval_metric")}]
+
+    folds = prepare_folds(x.to_numpy(dtype="float64"), y.to_numpy(), games.date, args.folds)
+    for fold in folds:
+        print(f"Fold {fold['fold']}: {fold['train_games']} training games, testing from {fold['test_start']} ({len(fold['y_test'])} games)")
+
+    # Fold results stay valid as long as the feature file is unchanged
+    cache_path = os.path.join(CACHE_DIR, f"cv_{file_hash(args.features)[:16]}.json")
+    # Fits run in joblib workers, so this stage's CPU time leaves them out
+    with metrics.stage("walk_forward_fits", rows=len(candidates) * len(folds)):
+        cache = run_search(folds, candidates, cache_path, n_jobs=args.jobs)
+    ranking = summarize(cache, candidates, len(folds))
+
+    print(f"\n{'log loss':>8}  {'brier':>6}  {'acc':>6}  {'trees':>5}  params")
+    for row in ranking[:10]:
+        print(f"{row['log_loss']:8.4f}  {row['brier']:6.4f}  {row['accuracy']:6.3f}  {row['n_estimators']:5d}  {row['params']}")
+
+    if args.search:
+        best = ranking[0]
+        params = {**MODEL_PARAMS, **best["params"], "n_estimators": best["n_estimators"]}
+        with open(args.best_params, "w") as f:
+            json.dump(params, f, indent=2)
+        print(f"\nBest parameters saved to {args.best_params}; train with --params {args.best_params}")
+
+
+def main():
+    from sklearn.metrics import accuracy_score, classification_report
+
+    parser = argparse.ArgumentParser(description="Train the game outcome model")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the feature importance plot (and the matplotlib import)")
+    parser.add_argument("--params", type=str, default=None, help="JSON file of XGBoost parameters (e.g. from --search) to train with")
+    parser.add_argument("--incremental", action="store_true", help="Warm-start the saved model on newly completed games (full rebuild when needed)")
+    parser.add_argument("--rounds", type=int, default=UPDATE_ROUNDS, help="Boosting rounds added by --incremental")
+    parser.add_argument("--export", action="store_true", help="Only (re)export the saved model to its NumPy-only format and verify it")
+    parser.add_argument("--walk-forward", action="store_true", help="Report walk-forward cross-validation of the model parameters instead of training")
+    parser.add_argument("--search", action="store_true", help="Walk-forward hyperparameter search instead of training")
+    parser.add_argument("--folds", type=int, default=5, help="Walk-forward folds")
+    parser.add_argument("--candidates", type=int, default=None, help="Random sample of this many search candidates (default: full grid)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for sampling search candidates")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel fold fits (-1 = all cores)")
+    parser.add_argument("--features", type=str, default="data/mlb_features.csv", help="Feature table CSV")
+    parser.add_argument("--best-params", type=str, default="models/best_params.json", help="Where --search writes the best parameters")
+    args = parser.parse_args()
 
-features_df = pd.read_csv("data/mlb_features.csv")
+    # Only completed games are used for training, oldest first; features
+    # stay float64 so the scaler and model fit exactly as on the CSV
+    games = final_games(load_compact(dtype=np.float64, csv_path=args.features,
+                                     store_path=os.path.splitext(args.features)[0] + ".arrow"))
+    x, y = training_data(games)
 
-played_games_df = features_df[features_df["target"] != -1].copy()
+    if args.export:
+        scaler, model = joblib.load(MODEL_FILE)
+        export_compiled(scaler, model, x)
+        return
 
-x = played_games_df.drop(columns=["target", "home_team", "away_team", "home_starter", "away_starter", "date", "home_score", "away_score"])
-x = x.fillna(0.5)
-y = played_games_df["target"]
+    if args.walk_forward or args.search:
+        walk_forward(games, x, y, args)
+        return
 
-X_train, X_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42, shuffle=True)
+    params = MODEL_PARAMS
+    if args.params:
+        with open(args.params, "r") as f:
+            params = json.load(f)
 
-# Optional: scale features (helps some models)
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+    if args.incremental and incremental_update(games, x, y, args.rounds, params) is not None:
+        return
 
-from sklearn.ensemble import RandomForestClassifier
-import xgboost as xgb
-from xgboost import XGBClassifier
-from sklearn.metrics import accuracy_score, classification_report
+    with metrics.stage("train", rows=len(x)):
+        scaler, model, X_test_scaled, y_test = train(x, y, params)
 
-# Initialize and train model
-model = xgb.XGBClassifier(
-    n_estimators=1200,
-    learning_rate=0.025,
-    max_depth=2,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    random_state=42,
-    eval_metric="logloss",
-)
+    # Make predictions
+    y_pred = model.predict(X_test_scaled)
 
-model.fit(X_train_scaled, y_train)
+    # Evaluate
+    print("Accuracy:", accuracy_score(y_test, y_pred))
+    print(classification_report(y_test, y_pred))
 
-# Make predictions
-y_pred = model.predict(X_test_scaled)
+    # The held-out games only score the parameters; the saved model is
+    # refit on every game so it (and its metadata) covers the latest ones
+    with metrics.stage("refit", rows=len(x)):
+        scaler, model = fit(x, y, params)
 
-# Evaluate
-print("Accuracy:", accuracy_score(y_test, y_pred))
-print(classification_report(y_test, y_pred))
+    trained_through = str(pd.Timestamp(games.date.max()).date())
+    meta = save_model(scaler, model, {
+        "mode": "full",
+        "params": params,
+        "features": list(x.columns),
+        "trained_through": trained_through,
+        "full_fit_through": trained_through,
+        "games": len(x),
+        "added_rounds": 0,
+        "drift": 0.0,
+    }, x)
+    print(f"Saved model v{meta['version']} (trained through {trained_through})")
 
-joblib.dump((scaler, model), "models/logreg_with_scaler.pkl")
+    # Get importance scores
+    importance = model.feature_importances_
 
-import matplotlib.pyplot as plt
+    # Map to feature names
+    feature_names = x.columns
+    feat_imp = dict(zip(feature_names, importance))
 
-# Get importance scores
-importance = model.feature_importances_
+    # Sort by importance
+    feat_imp = dict(sorted(feat_imp.items(), key=lambda item: item[1], reverse=True))
 
-# Map to feature names
-feature_names = x.columns
-feat_imp = dict(zip(feature_names, importance))
+    # Print
+    for f, score in feat_imp.items():
+        print(f"{f}: {score:.3f}")
 
-# Sort by importance
-feat_imp = dict(sorted(feat_imp.items(), key=lambda item: item[1], reverse=True))
+    if not args.no_plot:
+        import matplotlib.pyplot as plt
 
-# Print
-for f, score in feat_imp.items():
-    print(f"{f}: {score:.3f}")
+        plt.figure(figsize=(10,6))
+        plt.barh(list(feat_imp.keys()), list(feat_imp.values()))
+        plt.gca().invert_yaxis()  # largest on top
+        plt.xlabel("Feature Importance")
+        plt.title("XGBoost Feature Importance")
+        plt.show()
 
-plt.figure(figsize=(10,6))
-plt.barh(list(feat_imp.keys()), list(feat_imp.values()))
-plt.gca().invert_yaxis()  # largest on top
-plt.xlabel("Feature Importance")
-plt.title("XGBoost Feature Importance")
-plt.show()
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+
+import numpy as np
+from sklearn.metrics import accuracy_score, brier_score_loss, log_loss
+from sklearn.preprocessing import StandardScaler
+
+from utils.instrumentation import metrics
+
+CACHE_DIR = "models/cache"
+
+# Grid the search samples from; every candidate uses early stopping, so
+# n_estimators is only an upper bound
+SEARCH_SPACE = {
+    "max_depth": [2, 3, 4],
+    "learning_rate": [0.01, 0.025, 0.05],
+    "subsample": [0.7, 0.8, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+    "min_child_weight": [1, 5],
+}
+MAX_ROUNDS = 3000
+EARLY_STOPPING_ROUNDS = 100
+# Share of each training window held back (its most recent games) for early stopping
+EARLY_STOPPING_FRACTION = 0.15
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def walk_forward_splits(dates, n_folds):
+    """
+    Expanding-window splits over games sorted by date: the unique dates are
+    cut into n_folds + 1 blocks and fold k trains on blocks 0..k and tests
+    on block k + 1. A date never ends up on both sides of a split.
+    Returns a list of (train_end, test_end) row positions.
+    """
+    unique_dates = np.unique(dates)
+    edges = np.linspace(0, len(unique_dates), n_folds + 2).astype(int)[1:]
+    boundaries = [np.searchsorted(dates, unique_dates[edge], side="left") if edge < len(unique_dates) else len(dates) for edge in edges]
+    return [(boundaries[k], boundaries[k + 1]) for k in range(n_folds)]
+
+
+def prepare_folds(X, y, dates, n_folds):
+    """
+    Build every fold's scaled matrices once so all candidates reuse them.
+    X, y and dates must be sorted by date.
+    """
+    folds = []
+    for k, (train_end, test_end) in enumerate(walk_forward_splits(dates, n_folds)):
+        stop_start = int(train_end * (1 - EARLY_STOPPING_FRACTION))
+        scaler = StandardScaler().fit(X[:stop_start])
+        folds.append({
+            "fold": k,
+            "train_games": stop_start,
+            "test_start": str(dates[train_end])[:10],
+            "X_train": scaler.transform(X[:stop_start]).astype(np.float32),
+            "y_train": y[:stop_start],
+            "X_stop": scaler.transform(X[stop_start:train_end]).astype(np.float32),
+            "y_stop": y[stop_start:train_end],
+            "X_test": scaler.transform(X[train_end:test_end]).astype(np.float32),
+            "y_test": y[train_end:test_end],
+        })
+    return folds
+
+
+def fit_fold(params, fold):
+    """Train one candidate on one fold with early stopping and score it on the test block."""
+    import xgboost as xgb
+
+    model = xgb.XGBClassifier(
+        **{**params, "n_estimators": MAX_ROUNDS},
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        eval_metric="logloss",
+        random_state=42,
+        n_jobs=1,
+    )
+    model.fit(fold["X_train"], fold["y_train"], eval_set=[(fold["X_stop"], fold["y_stop"])], verbose=False)
+    probs = model.predict_proba(fold["X_test"])[:, 1]
+    return {
+        "fold": fold["fold"],
+        "test_start": fold["test_start"],
+        "best_iteration": int(model.best_iteration),
+        "log_loss": float(log_loss(fold["y_test"], probs, labels=[0, 1])),
+        "brier": float(brier_score_loss(fold["y_test"], probs)),
+        "accuracy": float(accuracy_score(fold["y_test"], probs >= 0.5)),
+    }
+
+
+def candidate_grid(n_candidates=None, seed=42, space=SEARCH_SPACE):
+    """All parameter combinations of the search space, or a reproducible random sample of them."""
+    keys = list(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    if n_candidates is not None and n_candidates < len(grid):
+        grid = random.Random(seed).sample(grid, n_candidates)
+    return grid
+
+
+def task_key(params, fold, n_folds):
+    return json.dumps({"params": params, "fold": fold, "n_folds": n_folds}, sort_keys=True)
+
+
+def run_search(folds, candidates, cache_path, n_jobs=-1):
+    """
+    Fit every (candidate, fold) pair in parallel, skipping pairs already in
+    the cache file. Each finished pair is written to the cache straight
+    away, so an interrupted search resumes where it stopped.
+    Returns {task key: fold result} for every pair.
+    """
+    from joblib import Parallel, delayed
+
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+
+    n_folds = len(folds)
+    todo = [
+        (params, fold) for params in candidates for fold in folds
+        if task_key(params, fold["fold"], n_folds) not in cache
+    ]
+    print(f"{len(candidates) * n_folds - len(todo)} fold fits cached, {len(todo)} to run...")
+    metrics.cache("walk_forward_fits", True, len(candidates) * n_folds - len(todo))
+    metrics.cache("walk_forward_fits", False, len(todo))
+
+    def run(params, fold):
+        return task_key(params, fold["fold"], n_folds), fit_fold(params, fold)
+
+    if todo:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        results = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+            delayed(run)(params, fold) for params, fold in todo
+        )
+        for done, (key, result) in enumerate(results, start=1):
+            cache[key] = result
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, cache_path)
+            if done % 10 == 0 or done == len(todo):
+                print(f"  {done}/{len(todo)} fold fits done")
+    return cache
+
+
+def summarize(cache, candidates, n_folds):
+    """Mean fold metrics per candidate, best (lowest log loss) first."""
+    rows = []
+    for params in candidates:
+        results = [cache[task_key(params, k, n_folds)] for k in range(n_folds)]
+        rows.append({
+            "params": params,
+            "log_loss": float(np.mean([r["log_loss"] for r in results])),
+            "brier": float(np.mean([r["brier"] for r in results])),
+            "accuracy": float(np.mean([r["accuracy"] for r in results])),
+            # Rounds to use when refitting on everything
+            "n_estimators": int(np.median([r["best_iteration"] for r in results])) + 1,
+            "folds": results,
+        })
+    return sorted(rows, key=lambda row: row["log_loss"])
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from features.compact import NON_FEATURE_COLUMNS
+from features.team_features import (
+    DEFAULT_WIN_PCT, DEFAULT_RUNS_PG, FEATURE_COLUMNS, TEAM_STAT_COLUMNS, add_pitcher_stats
+)
+from utils.instrumentation import metrics
+
+
+def team_stats(state, season):
+    """
+    Pre-game team features (win %, last-10 win %, runs scored/allowed per
+    game) for every team in a saved team state, as a frame indexed by team.
+    Same formulas and defaults as pregame_team_stats().
+    """
+    rows = {}
+    for team, record in state[int(season)].items():
+        games = record["games"]
+        last10 = record["last10"]
+        rows[team] = {
+            "win_pct": record["wins"] / games if games else DEFAULT_WIN_PCT,
+            "last10_win_pct": sum(last10) / len(last10) if last10 else DEFAULT_WIN_PCT,
+            "runs_pg": record["runs_scored"] / games if games else DEFAULT_RUNS_PG,
+            "runs_allowed_pg": record["runs_allowed"] / games if games else DEFAULT_RUNS_PG,
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")[TEAM_STAT_COLUMNS].sort_index()
+
+
+def matchup_features(stats, date, home_teams, away_teams, home_starters=None, away_starters=None, pitcher_stat=None):
+    """
+    Feature rows (FEATURE_COLUMNS, scheduled) for any home/away pairs and
+    starters, built column-wise from team_stats() output. Starters may be
+    None for "unknown"; their ERA/WHIP come from pitcher_stat exactly as in
+    build_features().
+    """
+    n = len(home_teams)
+    features = pd.DataFrame({
+        "date": pd.Series(pd.Timestamp(date), index=range(n)),
+        "home_team": np.asarray(home_teams, dtype=object),
+        "away_team": np.asarray(away_teams, dtype=object),
+        "home_starter": np.asarray(home_starters if home_starters is not None else [None] * n, dtype=object),
+        "away_starter": np.asarray(away_starters if away_starters is not None else [None] * n, dtype=object),
+    })
+    for side, teams in [("home", home_teams), ("away", away_teams)]:
+        side_stats = stats.loc[list(teams)].to_numpy()
+        for i, col in enumerate(TEAM_STAT_COLUMNS):
+            features[f"{side}_{col}"] = side_stats[:, i]
+
+    features = add_pitcher_stats(features, pitcher_stat)
+    features["home_score"] = np.nan
+    features["away_score"] = np.nan
+    features["target"] = -1
+
+    features = features[FEATURE_COLUMNS].copy()
+    numeric_cols = features.select_dtypes(include="number").columns
+    features[numeric_cols] = features[numeric_cols].fillna(0.5)
+    return features
+
+
+def score(scaler, model, features):
+    """Home win probability of every row, in one inference call."""
+    with metrics.stage("score_matchups", rows=len(features)):
+        X = features.drop(columns=NON_FEATURE_COLUMNS)
+        return model.predict_proba(scaler.transform(X))[:, -1]
+
+
+def matchup_grid(scaler, model, stats, date, teams=None, pitcher_stat=None):
+    """
+    Home win probability for every ordered pair of distinct teams (starters
+    unknown) as a home team x away team frame, NaN on the diagonal.
+    """
+    teams = list(stats.index) if teams is None else list(teams)
+    home, away = np.meshgrid(teams, teams, indexing="ij")
+    pairs = home != away
+    features = matchup_features(stats, date, home[pairs], away[pairs], pitcher_stat=pitcher_stat)
+
+    grid = np.full(home.shape, np.nan)
+    grid[pairs] = score(scaler, model, features)
+    return pd.DataFrame(grid, index=pd.Index(teams, name="home_team"), columns=pd.Index(teams, name="away_team"))
+
+
+def starter_matchups(scaler, model, stats, date, home_team, away_team, home_starters, away_starters, pitcher_stat=None):
+    """
+    Every combination of the given home and away starters for one matchup,
+    scored in one call. Returns the feature rows with a home_win_prob column.
+    """
+    home_starters, away_starters = list(home_starters) or [None], list(away_starters) or [None]
+    home_grid, away_grid = np.meshgrid(np.asarray(home_starters, dtype=object), np.asarray(away_starters, dtype=object), indexing="ij")
+    n = home_grid.size
+    features = matchup_features(
+        stats, date, [home_team] * n, [away_team] * n, home_grid.ravel(), away_grid.ravel(), pitcher_stat=pitcher_stat
+    )
+    features["home_win_prob"] = score(scaler, model, features)
+    return features
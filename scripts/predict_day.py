@@ -1,8 +1,15 @@
-import joblib
 import argparse
-import pandas as pd
+import csv
+import json
+import os
+import sys
 from datetime import datetime
 
+# Allow running as `python scripts/predict_day.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scripts.prediction_client import query, DEFAULT_SERVER
+
 # Color formatting strings
 RESET = "\033[0m"
 BOLD = "\033[1m"
@@ -12,57 +19,81 @@ MAGENTA = "\033[95m"
 BLUE = "\033[94m"
 YELLOW = "\033[93m"
 
-def prob_to_american(prob: float) -> int:
-    if prob == 0:
-        return 99999  # avoid division by zero
-    if prob == 1:
-        return -99999
-    if prob >= 0.5:
-        return int(- (prob / (1 - prob)) * 100)
-    else:
-        return int(((1 - prob) / prob) * 100)
-
-# Argument parser
-parser = argparse.ArgumentParser(description="Predict all MLB games on a day")
-parser.add_argument("--date", type=str, default=datetime.today().strftime("%Y-%m-%d"), help="Date in format YYYY-MM-DD")
-args = parser.parse_args()
-
-DATE = args.date
-DATE_FORMATTED = datetime.strptime(DATE, "%Y-%m-%d").strftime("%A, %B %d, %Y").replace(" 0", " ")
+OUTPUT_FIELDS = ["date", "home_team", "away_team", "home_starter", "away_starter", "home_win_prob", "winner", "win_prob", "odds"]
 
-# Load model & features
-scaler, model = joblib.load("models/logreg_with_scaler.pkl")
-features_df = pd.read_csv("data/mlb_features.csv")
 
-# Filter today's games
-today = features_df[features_df["date"] == DATE].copy().reset_index(drop=True)
+def format_date(date):
+    return datetime.strptime(date, "%Y-%m-%d").strftime("%A, %B %d, %Y").replace(" 0", " ")
 
-if today.empty:
-    print(f"No games found on {DATE_FORMATTED}.")
-else:
-    X = today.drop(columns=["home_team", "away_team", "home_starter", "away_starter", "target", "date", "home_score", "away_score"])
-    X_scaled = scaler.transform(X)
 
+def print_table(date, games):
     col_width = [50, 50, 25, 7, 7]
     total_width = sum(col_width) + len(col_width) + 1  # accounting for separators
 
     # Print header with box-drawing characters
-    print(f"\nMLB Predictions for {BOLD}{DATE_FORMATTED}{RESET}")
+    print(f"\nMLB Predictions for {BOLD}{format_date(date)}{RESET}")
     print("╔" + "═"*total_width + "╗")
     print(f"║ {BLUE + BOLD}{'Home Team':{col_width[0]}} {YELLOW + BOLD}{'Away Team':{col_width[1]}}{RESET} {GREEN + BOLD}{'Predicted Winner':{col_width[2]}}{RESET} {MAGENTA + BOLD}{'Win %':>{col_width[3]}}{RESET} {MAGENTA + BOLD}{'Odds':>{col_width[4]}}{RESET} ║")
     print("╠" + "═"*total_width + "╣")
 
     # Print rows
-    for idx, game in today.iterrows():
-        home_team = today["home_team"][idx]
-        away_team = today["away_team"][idx]
-        home_starter = str(today["home_starter"][idx]) if pd.notna(today["home_starter"][idx]) else "TBD"
-        away_starter = str(today["away_starter"][idx]) if pd.notna(today["away_starter"][idx]) else "TBD"
+    for game in games:
+        home = f"{game['home_team']} ({game['home_starter'] or 'TBD'})"
+        away = f"{game['away_team']} ({game['away_starter'] or 'TBD'})"
 
-        prob = model.predict_proba(X_scaled)[:, -1][idx]
-        winner = home_team if prob >= 0.5 else away_team
-        win_prob = prob if winner == home_team else 1 - prob
-
-        print(f"║ {(home_team + " (" + home_starter + ")"):{col_width[0]}} {(away_team  + " (" + away_starter + ")"):{col_width[1]}} {winner:{col_width[2]}} {win_prob*100:{col_width[3]-1}.1f}% {prob_to_american(win_prob):{col_width[4]}} ║")
+        print(f"║ {home:{col_width[0]}} {away:{col_width[1]}} {game['winner']:{col_width[2]}} {game['win_prob']*100:{col_width[3]-1}.1f}% {game['odds']:{col_width[4]}} ║")
 
     print("╚" + "═"*total_width + "╝")
+
+
+# Argument parser
+parser = argparse.ArgumentParser(description="Predict all MLB games on a day or a range of days")
+parser.add_argument("--date", type=str, default=datetime.today().strftime("%Y-%m-%d"), help="Date in format YYYY-MM-DD")
+parser.add_argument("--start", type=str, default=None, help="First date of a range (overrides --date)")
+parser.add_argument("--end", type=str, default=None, help="Last date of a range (defaults to --start)")
+parser.add_argument("--format", choices=["table", "csv", "json"], default="table", help="Box-drawing table, CSV, or JSON Lines (one game per line)")
+parser.add_argument("--output", type=str, default=None, help="Write csv/json output to this file instead of stdout")
+parser.add_argument("--server", type=str, nargs="?", const=DEFAULT_SERVER, default=None, help=f"Ask a running prediction service (default {DEFAULT_SERVER}) instead of loading the model")
+args = parser.parse_args()
+
+START = args.start or args.date
+END = args.end or START
+DATE_FORMATTED = format_date(START) if START == END else f"{format_date(START)} - {format_date(END)}"
+
+if args.server:
+    games = query(args.server, "range", start=START, end=END)["games"]
+else:
+    from features.compact import load_compact
+    from models.compiled_model import load_model
+    from scripts.predictor import iter_predictions, MODEL_FILE
+
+    # Load model & only the games in the range, scaled once on load
+    scaler, model = load_model(MODEL_FILE)
+    features = load_compact(scaler, start=START, end=END)
+
+    # Score every game in the range in one call; records are built lazily
+    games = iter_predictions(scaler, model, features)
+
+if args.format == "table":
+    # Group into one table per day
+    by_date = {}
+    for game in games:
+        by_date.setdefault(game["date"], []).append(game)
+
+    if not by_date:
+        print(f"No games found on {DATE_FORMATTED}.")
+    for date, day_games in by_date.items():
+        print_table(date, day_games)
+else:
+    # Stream rows out as they are produced
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    if args.format == "csv":
+        writer = csv.DictWriter(out, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for game in games:
+            writer.writerow(game)
+    else:
+        for game in games:
+            out.write(json.dumps({field: game[field] for field in OUTPUT_FIELDS}) + "\n")
+    if args.output:
+        out.close()
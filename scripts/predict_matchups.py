@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Allow running as `python scripts/predict_matchups.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from features.get_stats import PITCHER_STATS, pitcher_store, get_pitcher_stat_cached
+from features.team_features import load_team_state
+from models.compiled_model import load_model
+from scripts.matchups import team_stats, matchup_grid, starter_matchups
+from scripts.predictor import MODEL_FILE, prob_to_american
+from utils.resolve_alias import resolve_alias
+
+parser = argparse.ArgumentParser(description="What-if predictions for any matchups and starters from the current team state")
+parser.add_argument("--state", type=str, default="data/team_state.json", help="Team state checkpoint to build features from")
+parser.add_argument("--teams", nargs="+", default=None, help="Teams to include in the grid (default: every team in the state)")
+parser.add_argument("--home", type=str, default=None, help="Home team for a starter what-if (with --away)")
+parser.add_argument("--away", type=str, default=None, help="Away team for a starter what-if (with --home)")
+parser.add_argument("--home-starters", nargs="+", default=[], help="Home starters to try (default: unknown)")
+parser.add_argument("--away-starters", nargs="+", default=[], help="Away starters to try (default: unknown)")
+parser.add_argument("--fetch", action="store_true", help="Fetch starters missing from the pitcher stats store from the API")
+parser.add_argument("--format", choices=["table", "csv", "json"], default="table", help="Output format")
+parser.add_argument("--output", type=str, default=None, help="Write csv/json output to this file instead of stdout")
+args = parser.parse_args()
+
+if (args.home is None) != (args.away is None):
+    parser.error("--home and --away go together")
+
+if not os.path.exists(args.state):
+    parser.error(f"No team state at {args.state}; run features/feature_engineering.py to write it")
+checkpoint = load_team_state(args.state)
+season = max(checkpoint["teams"])
+stats = team_stats(checkpoint["teams"], season)
+# Features describe the first day after the checkpoint
+date = checkpoint["as_of"] + pd.Timedelta(days=1)
+
+if args.fetch:
+    pitcher_stat = get_pitcher_stat_cached
+    for name in args.home_starters + args.away_starters:
+        pitcher_stat(name, PITCHER_STATS[0], str(season))
+else:
+    def pitcher_stat(name, stat, season):
+        # Nothing is refreshed here, so stored values of any age count
+        return pitcher_store.get(name, season, [stat], allow_stale=True).get(stat)
+
+
+def known_starters(names):
+    # A starter without stored stats would get the 0.5 fill of a failed
+    # lookup, which reads as an ace; score them as TBD instead
+    unknown = [name for name in names if not pitcher_store.get(name, str(season), PITCHER_STATS, allow_stale=True)]
+    for name in unknown:
+        print(f"No {season} stats for {name}, treating as TBD.", file=sys.stderr)
+    return [None if name in unknown else name for name in names]
+
+
+scaler, model = load_model(MODEL_FILE)
+out = open(args.output, "w", newline="") if args.output else sys.stdout
+
+if args.home is not None:
+    home_team, away_team = resolve_alias(args.home), resolve_alias(args.away)
+    games = starter_matchups(
+        scaler, model, stats, date, home_team, away_team,
+        known_starters(args.home_starters), known_starters(args.away_starters), pitcher_stat
+    )
+    games["odds"] = [prob_to_american(p) for p in games["home_win_prob"]]
+    columns = ["home_team", "away_team", "home_starter", "away_starter",
+               "home_pitcher_era", "away_pitcher_era", "home_win_prob", "odds"]
+    games = games[columns].fillna({"home_starter": "TBD", "away_starter": "TBD"})
+
+    if args.format == "table":
+        print(f"{home_team} vs {away_team}, as of {checkpoint['as_of'].date()}", file=out)
+        print(games.drop(columns=["home_team", "away_team"]).to_string(index=False, float_format=lambda p: f"{p:.3f}"), file=out)
+    elif args.format == "csv":
+        games.to_csv(out, index=False)
+    else:
+        for game in games.to_dict(orient="records"):
+            out.write(json.dumps(game) + "\n")
+else:
+    teams = None if args.teams is None else [resolve_alias(team) for team in args.teams]
+    grid = matchup_grid(scaler, model, stats, date, teams, pitcher_stat)
+
+    if args.format == "table":
+        # Number the teams so the away columns stay narrow
+        numbers = {team: i for i, team in enumerate(grid.index, start=1)}
+        table = grid.rename(index=lambda team: f"{numbers[team]:2d} {team}", columns=numbers)
+        print(f"Home win probability (rows: home, columns: away), as of {checkpoint['as_of'].date()}", file=out)
+        print(table.to_string(float_format=lambda p: f"{p:.2f}", na_rep="-"), file=out)
+    elif args.format == "csv":
+        grid.to_csv(out, float_format="%.6f")
+    else:
+        json.dump({
+            "as_of": checkpoint["as_of"].strftime("%Y-%m-%d"),
+            "home_win_prob": {home: row.dropna().to_dict() for home, row in grid.iterrows()},
+        }, out)
+        out.write("\n")
+
+if args.output:
+    out.close()
@@ -1,84 +1,108 @@
+import argparse
+import json
+import os
+import sys
+import time
+
 import pandas as pd
-import joblib
 import numpy as np
-from tqdm import tqdm
 
-print("Running prediction...")
+# Allow running as `python scripts/predict_season.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from features.compact import load_compact
+from models.compiled_model import load_model
+from scripts.simulation import season_arrays, simulate_aggregate
+from utils.divisions import DIVISIONS, WILD_CARDS, team_division, division_league
+from utils.instrumentation import metrics
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the rest of the MLB season")
+    parser.add_argument("--simulations", type=int, default=1000, help="Number of seasons to simulate")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to spread shards over")
+    parser.add_argument("--shards", type=int, default=16, help="Independent RNG streams the simulations are split into")
+    parser.add_argument("--output", type=str, default=None, help="Write win histograms, rank distributions and playoff odds to this JSON file")
+    args = parser.parse_args()
 
-# Load model and scaler
-scaler, model = joblib.load("models/logreg_with_scaler.pkl")
+    print("Running prediction...")
 
-# Load features
-features_df = pd.read_csv("data/mlb_features.csv")
+    # Load model and scaler
+    scaler, model = load_model("models/logreg_with_scaler.pkl")
 
-# Keep only scheduled games
-upcoming = features_df[features_df["target"] == -1].copy()
-completed = features_df[features_df["target"] != -1]
+    # Every game once, with the scaled model inputs precomputed
+    features = load_compact(scaler)
+    upcoming = features.scheduled()
+
+    if len(upcoming) == 0:
+        print("No upcoming games found in this feature file.")
+        return
 
-if upcoming.empty:
-    print("No upcoming games found in this feature file.")
-else:
     # Predict upcoming games
-    X_upcoming = upcoming.drop(columns=["target", "home_team", "away_team", "home_starter", "away_starter", "date", "home_score", "away_score"])
-    X_scaled = scaler.transform(X_upcoming)
-    predictions = model.predict(X_scaled)
-    probabilities = model.predict_proba(X_scaled)[:, 1]
-
-    upcoming["prediction"] = predictions
-    upcoming["home_win_prob"] = probabilities.round(3)
-
-    # Compute predicted final standings
-    teams = pd.concat([features_df["home_team"], features_df["away_team"]]).unique()
-    total_wins = {team: [] for team in teams}
-    team_ranks = {team: [] for team in teams}
-    n_simulations = 1000
-
-    for sim in tqdm(range(n_simulations), desc="Simulating seasons", colour="cyan"):
-        sim_wins = {}
-
-        # Count actual wins from completed games
-        for team in teams:
-            home_wins = completed[completed["home_team"] == team]["target"].sum()
-            away_wins = completed[completed["away_team"] == team]["target"].apply(lambda x: 0 if x == 1 else 1).sum()
-            sim_wins[team] = home_wins + away_wins
-
-        # Add predicted wins from upcoming games
-        for idx, row in upcoming.iterrows():
-            home = row["home_team"]
-            away = row["away_team"]
-            prob = row["home_win_prob"]
-            # Sample outcome: 1 = home wins, 0 = away wins
-            home_win = np.random.binomial(1, prob)
-            if home_win:
-                sim_wins[home] += 1
-            else:
-                sim_wins[away] += 1
-
-        # Sort teams by wins
-        sim_rank_df = pd.DataFrame({
-            "team": list(sim_wins.keys()),
-            "wins": list(sim_wins.values())
-        }).sort_values("wins", ascending=False).reset_index(drop=True)
-
-        # Add 1 to avg rank to account for zero-based indexing
-        for idx, row in sim_rank_df.iterrows():
-            team = row["team"]
-            team_ranks[team].append(idx + 1)
-
-        for team, wins in sim_wins.items():
-            total_wins[team].append(wins)
+    home_probs = model.predict_proba(upcoming.inputs)[:, 1].round(3)
+
+    # Wins from completed games are counted once; every simulated season
+    # only draws the upcoming games
+    teams, base_wins, home_idx, away_idx = season_arrays(features, upcoming)
+
+    # Division and league of each team, -1 for teams outside DIVISIONS
+    division_names = list(DIVISIONS)
+    league_names = sorted({division_league(d) for d in division_names})
+    divisions = [team_division(team) for team in teams]
+    division_idx = np.array([division_names.index(d) if d else -1 for d in divisions])
+    league_idx = np.array([league_names.index(division_league(d)) if d else -1 for d in divisions])
+
+    start = time.perf_counter()
+    # CPU time of worker processes (--processes > 1) is not included
+    with metrics.stage("simulate_seasons", rows=args.simulations):
+        results = simulate_aggregate(
+            base_wins, home_idx, away_idx, home_probs,
+            division_idx, league_idx, WILD_CARDS,
+            n_sims=args.simulations, seed=args.seed, shards=args.shards, processes=args.processes,
+        )
+    print(f"Simulated {results.n_sims} seasons in {time.perf_counter() - start:.2f}s")
 
     # Create standings DataFrame
     final_standings = pd.DataFrame({
         "team": teams,
-        "predicted_wins": [round(np.mean(total_wins[team]), 2) for team in teams],
-        "avg_rank": [round(np.mean(team_ranks[team]), 2) for team in teams]
+        "predicted_wins": results.mean_wins().round(2),
+        "avg_rank": results.mean_rank().round(2),
+        "division_pct": (results.division / results.n_sims * 100).round(1),
+        "wildcard_pct": (results.wildcard / results.n_sims * 100).round(1),
+        "playoff_pct": ((results.division + results.wildcard) / results.n_sims * 100).round(1),
     })
     final_standings = final_standings.sort_values("predicted_wins", ascending=False)
     final_standings["rank"] = range(1, len(final_standings) + 1)
 
     # Organize for output
-    final_standings = final_standings[["rank", "team", "predicted_wins", "avg_rank"]]
+    final_standings = final_standings[["rank", "team", "predicted_wins", "avg_rank", "division_pct", "wildcard_pct", "playoff_pct"]]
 
     print("\n\033[1;35mPredicted Final Standings:\033[0m")
     print(final_standings.to_string(index=False))
+
+    if args.output:
+        report = {
+            "simulations": results.n_sims,
+            "seed": args.seed,
+            "teams": {
+                team: {
+                    "division": divisions[i],
+                    # win_histogram[w] = share of seasons ending with w wins
+                    "win_histogram": (results.win_hist[i] / results.n_sims).tolist(),
+                    # rank_distribution[r] = share of seasons finishing (r + 1)th overall
+                    "rank_distribution": (results.rank_hist[i] / results.n_sims).tolist(),
+                    "division_prob": results.division[i] / results.n_sims,
+                    "wildcard_prob": results.wildcard[i] / results.n_sims,
+                    "playoff_prob": (results.division[i] + results.wildcard[i]) / results.n_sims,
+                }
+                for i, team in enumerate(teams)
+            },
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f)
+        print(f"\nDistributions saved to {args.output}")
+
+
+# Worker processes re-import this module under the spawn/forkserver start methods
+if __name__ == "__main__":
+    main()
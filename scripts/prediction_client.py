@@ -0,0 +1,17 @@
+import json
+
+# Default address of scripts/prediction_service.py
+DEFAULT_SERVER = "http://127.0.0.1:8765"
+
+
+def query(server, endpoint, **params):
+    """
+    Call a running prediction service and return its JSON response. Only
+    uses the standard library, so thin clients start without loading
+    pandas, joblib or the model.
+    """
+    from urllib.parse import urlencode
+    from urllib.request import urlopen
+
+    with urlopen(f"{server.rstrip('/')}/{endpoint}?{urlencode(params)}") as response:
+        return json.load(response)
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Allow running as `python scripts/prediction_service.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scripts.predictor import Predictor, MODEL_FILE, FEATURES_FILE
+from utils.instrumentation import metrics
+
+# How often (seconds) to check the model and feature files for changes
+RELOAD_INTERVAL = 2.0
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """
+    GET /game?home=<team>&away=<team>   scheduled games between two teams
+    GET /day?date=YYYY-MM-DD            every game on a day
+    GET /range?start=...&end=...        every game in a date range
+    GET /health                         model/feature file timestamps
+    GET /metrics                        request latencies, reloads and other run metrics
+    """
+
+    predictor = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with metrics.timed(f"service.{url.path}"):
+            self.handle_get(url)
+
+    def handle_get(self, url):
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        # Hot-reload when the model or feature file has been rewritten
+        if self.predictor.reload_if_stale(RELOAD_INTERVAL):
+            metrics.count("service_reloads")
+            print("Model or features changed, reloaded.")
+
+        try:
+            if url.path == "/game":
+                body = {"games": self.predictor.game(params["home"], params["away"])}
+            elif url.path == "/day":
+                body = {"games": self.predictor.day(params["date"])}
+            elif url.path == "/range":
+                body = {"games": self.predictor.date_range(params["start"], params["end"])}
+            elif url.path == "/health":
+                body = {"status": "ok", "mtimes": self.predictor.mtimes}
+            elif url.path == "/metrics":
+                body = metrics.report()
+            else:
+                self.send_json(404, {"error": f"Unknown endpoint {url.path}"})
+                return
+        except KeyError as e:
+            self.send_json(400, {"error": f"Missing parameter {e}"})
+            return
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        self.send_json(200, body)
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; dashboards poll this constantly
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve MLB predictions from a resident model and feature table")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--model", type=str, default=MODEL_FILE, help="Pickled (scaler, model) pair")
+    parser.add_argument("--features", type=str, default=FEATURES_FILE, help="Feature table CSV")
+    args = parser.parse_args()
+
+    PredictionHandler.predictor = Predictor(args.model, args.features)
+    server = ThreadingHTTPServer((args.host, args.port), PredictionHandler)
+    print(f"Serving predictions on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
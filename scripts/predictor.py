@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from features.compact import NAME_COLUMNS, CompactFeatures, load_compact
+from models.compiled_model import compiled_path, load_model
+from utils.instrumentation import metrics
+
+MODEL_FILE = "models/logreg_with_scaler.pkl"
+FEATURES_FILE = "data/mlb_features.csv"
+
+
+def prob_to_american(prob: float) -> int:
+    if prob == 0:
+        return 99999  # avoid division by zero
+    if prob == 1:
+        return -99999
+
+    if prob >= 0.5:  # favorite
+        return int(- (prob / (1 - prob)) * 100)
+    else:  # underdog
+        return int(((1 - prob) / prob) * 100)
+
+
+def score_games(scaler, model, games):
+    """Home win probability of every game in a CompactFeatures, in one predict_proba call."""
+    if games.inputs is None:
+        raise ValueError("Games must be loaded with the model's scaler to be scored")
+    with metrics.stage("predict", rows=len(games)):
+        return model.predict_proba(games.inputs)[:, -1]
+
+
+def game_records(games, probs, rows=None):
+    """
+    Yield one record per game (all, or the positions in rows) with the home
+    win probability, the predicted winner, the winner's probability and
+    fair American odds.
+    """
+    rows = np.arange(len(games)) if rows is None else np.asarray(rows, dtype=np.intp)
+    names = {}
+    for kind in ("teams", "starters"):
+        # A trailing None, so the -1 code of a missing starter looks it up
+        names[kind] = np.asarray(games.categories[kind].tolist() + [None], dtype=object)
+    columns = zip(
+        pd.DatetimeIndex(games.date[rows]).strftime("%Y-%m-%d"),
+        *(names[NAME_COLUMNS[column]][games.codes[column][rows]] for column in NAME_COLUMNS),
+        games.target[rows].tolist(), np.asarray(probs)[rows].tolist(),
+    )
+    for date, home_team, away_team, home_starter, away_starter, target, prob in columns:
+        winner = home_team if prob >= 0.5 else away_team
+        win_prob = prob if winner == home_team else 1 - prob
+        yield {
+            "date": date,
+            "home_team": home_team,
+            "away_team": away_team,
+            "home_starter": home_starter,
+            "away_starter": away_starter,
+            "scheduled": target == -1,
+            "home_win_prob": prob,
+            "winner": winner,
+            "win_prob": win_prob,
+            "odds": prob_to_american(win_prob),
+        }
+
+
+def iter_predictions(scaler, model, games):
+    """
+    Score every game in a CompactFeatures (or a slice of the feature table
+    frame) with one predict_proba call, then yield one record per game.
+    """
+    if len(games) == 0:
+        return
+    if not isinstance(games, CompactFeatures):
+        games = CompactFeatures.from_frame(games, scaler)
+    yield from game_records(games, score_games(scaler, model, games))
+
+
+def predict_games(scaler, model, games):
+    """List version of iter_predictions()."""
+    return list(iter_predictions(scaler, model, games))
+
+
+class Predictor:
+    """
+    Keeps the (scaler, model) pair and the compact feature table in memory,
+    with every game scored up front and indexed by date and by scheduled
+    matchup; records are built per request. Reloads itself when either file
+    changes on disk.
+    """
+
+    def __init__(self, model_file=MODEL_FILE, features_file=FEATURES_FILE):
+        self.model_file = model_file
+        self.features_file = features_file
+        self.lock = threading.Lock()
+        # Held while checking the files and reloading, so only one thread does it
+        self.reload_lock = threading.Lock()
+        self.last_check = time.monotonic()
+        self.mtimes = None
+        self.load()
+
+    def file_mtimes(self):
+        compiled = compiled_path(self.model_file)
+        compiled_mtime = os.path.getmtime(compiled) if os.path.exists(compiled) else None
+        return (os.path.getmtime(self.model_file), compiled_mtime, os.path.getmtime(self.features_file))
+
+    def load(self):
+        mtimes = self.file_mtimes()
+        scaler, model = load_model(self.model_file)
+        games = load_compact(scaler, csv_path=self.features_file, store_path=os.path.splitext(self.features_file)[0] + ".arrow")
+        probs = score_games(scaler, model, games) if len(games) else np.empty(0)
+
+        # Rows are sorted by date; index scheduled rows by (home, away)
+        scheduled = np.flatnonzero(games.target == -1)
+        pairs = pd.DataFrame({column: games.column(column)[scheduled] for column in ("home_team", "away_team")})
+        matchups = pairs.groupby(["home_team", "away_team"], observed=True).indices
+        matchups = {key: scheduled[positions].tolist() for key, positions in matchups.items()}
+
+        # Swap everything in at once so readers never see a half-loaded state
+        with self.lock:
+            self.scaler, self.model = scaler, model
+            self.games, self.probs, self.matchups = games, probs, matchups
+            self.mtimes = mtimes
+
+    def reload_if_changed(self):
+        with self.reload_lock:
+            return self._reload_if_changed()
+
+    def reload_if_stale(self, interval):
+        """
+        reload_if_changed() at most once per `interval` seconds, for request
+        threads: while one thread checks or reloads, the others skip the
+        check and keep serving the loaded state.
+        """
+        if not self.reload_lock.acquire(blocking=False):
+            return False
+        try:
+            now = time.monotonic()
+            if now - self.last_check <= interval:
+                return False
+            self.last_check = now
+            return self._reload_if_changed()
+        finally:
+            self.reload_lock.release()
+
+    def _reload_if_changed(self):
+        try:
+            changed = self.file_mtimes() != self.mtimes
+        except OSError:
+            return False
+        if changed:
+            self.load()
+        return changed
+
+    def game(self, home_team, away_team):
+        """Scheduled games between two teams, soonest first."""
+        with self.lock:
+            return list(game_records(self.games, self.probs, self.matchups.get((home_team, away_team), [])))
+
+    def date_range(self, start, end):
+        """Every game from start to end (inclusive), as YYYY-MM-DD strings."""
+        with self.lock:
+            lo = np.searchsorted(self.games.date, np.datetime64(start), side="left")
+            hi = np.searchsorted(self.games.date, np.datetime64(end), side="right")
+            return list(game_records(self.games, self.probs, range(lo, hi)))
+
+    def day(self, date):
+        return self.date_range(date, date)
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Allow running as `python scripts/run_pipeline.py` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.pipeline import STATE_FILE, Pipeline, Stage
+
+FEATURES_FILE = "data/mlb_features.csv"
+MODEL_FILES = ["models/logreg_with_scaler.pkl", "models/logreg_with_scaler.json", "models/logreg_with_scaler.npz"]
+PREDICTIONS_DIR = "data/predictions"
+PITCHER_DB = "data/pitcher_stats.sqlite"
+# The pitcher cache by content: values and known misses, not when they were fetched
+PITCHER_QUERIES = [
+    "SELECT player, season, stat, value FROM pitcher_stats ORDER BY player, season, stat",
+    "SELECT player, season, stat FROM pitcher_misses ORDER BY player, season, stat",
+    "SELECT player, season, game_pk, date, outs, earned_runs, hits, walks FROM pitcher_game_logs ORDER BY player, season, game_pk",
+]
+# Code every stage runs besides its own script
+SHARED_CODE = ["utils/*.py", "features/feature_store.py", "features/compact.py", "features/team_features.py"]
+PREDICT_CODE = SHARED_CODE + ["models/compiled_model.py", "scripts/predictor.py"]
+
+
+def mlb_stages(args):
+    incremental = [] if args.full else ["--incremental"]
+    params = ["--params", args.params] if args.params else []
+    return [
+        Stage(
+            "features", "features/feature_engineering.py",
+            args=["--schedule", *args.schedule, *incremental, *args.features_args],
+            inputs=args.schedule + ["data/pitcher_stats_cache.json"],
+            databases={PITCHER_DB: PITCHER_QUERIES},
+            # It fills the pitcher cache itself
+            updates=[PITCHER_DB],
+            code=["features/*.py", "utils/*.py"],
+            staged={"--output": FEATURES_FILE, "--state": "data/team_state.json"},
+            siblings=["data/mlb_features.arrow"],
+            carry=True,
+        ),
+        Stage(
+            "train", "models/train_model.py",
+            args=["--no-plot", *incremental, *params],
+            inputs=[FEATURES_FILE] + ([args.params] if args.params else []),
+            code=["models/*.py"] + SHARED_CODE,
+            outputs=MODEL_FILES[:2],
+            after=["features"],
+        ),
+        # The two prediction stages only read the features and the model, so they run side by side
+        Stage(
+            "predict-day", "scripts/predict_day.py",
+            args=["--date", args.date, "--format", "csv"],
+            inputs=[FEATURES_FILE] + MODEL_FILES,
+            code=["scripts/predict_day.py"] + PREDICT_CODE,
+            staged={"--output": os.path.join(PREDICTIONS_DIR, f"{args.date}.csv")},
+            after=["train"],
+        ),
+        Stage(
+            "simulate", "scripts/predict_season.py",
+            args=["--simulations", args.simulations, "--seed", args.seed, "--processes", args.processes],
+            inputs=[FEATURES_FILE] + MODEL_FILES,
+            code=["scripts/predict_season.py", "scripts/simulation.py", "utils/divisions.py"] + PREDICT_CODE,
+            staged={"--output": os.path.join(PREDICTIONS_DIR, "season.json")},
+            after=["train"],
+        ),
+    ]
+
+
+parser = argparse.ArgumentParser(description="Run features -> train -> predictions, skipping stages whose inputs have not changed")
+parser.add_argument("--schedule", nargs="+", default=["data/mlb-2025-asplayed.csv"], help="As-played CSV file(s), one per season")
+parser.add_argument("--date", type=str, default=datetime.today().strftime("%Y-%m-%d"), help="Day to predict (YYYY-MM-DD)")
+parser.add_argument("--simulations", type=int, default=1000, help="Seasons to simulate")
+parser.add_argument("--seed", type=int, default=0, help="Simulation seed; fixed so reruns on the same inputs agree")
+parser.add_argument("--processes", type=int, default=1, help="Worker processes for the simulation")
+parser.add_argument("--params", type=str, default=None, help="Model parameter JSON for training (e.g. models/best_params.json)")
+parser.add_argument("--features-args", nargs=argparse.REMAINDER, default=[], help="Extra feature_engineering.py options (must come last)")
+parser.add_argument("--full", action="store_true", help="Rebuild features and retrain from scratch instead of incrementally")
+parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", help="Run these stages (or 'all') even if up to date")
+parser.add_argument("--jobs", type=int, default=2, help="Stages to run at the same time")
+parser.add_argument("--state", type=str, default=STATE_FILE, help="Where stage keys and file digests are kept")
+parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run")
+args = parser.parse_args()
+
+stages = mlb_stages(args)
+unknown = set(args.force) - {stage.name for stage in stages} - {"all"}
+if unknown:
+    parser.error(f"Unknown stages {sorted(unknown)}")
+os.makedirs(PREDICTIONS_DIR, exist_ok=True)
+
+status = Pipeline(stages, args.state, args.jobs, args.force, args.dry_run).run()
+sys.exit(1 if "failed" in status.values() else 0)
@@ -0,0 +1,184 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Upper bound on random draws held in memory at once (sims x games)
+CHUNK_DRAWS = 4_000_000
+
+
+def season_arrays(features, upcoming):
+    """
+    Index teams and games for simulation, from CompactFeatures sharing one
+    team category list (slices of the same load).
+
+    Returns (teams, base_wins, home_idx, away_idx) where base_wins holds each
+    team's wins from completed games and home_idx/away_idx are the team
+    indices of every upcoming game. Teams are in order of first appearance
+    in features, home column first.
+    """
+    home, away = features.codes["home_team"], features.codes["away_team"]
+    codes, first = np.unique(np.concatenate([home, away]), return_index=True)
+    codes = codes[np.argsort(first, kind="stable")]
+    teams = np.asarray(features.categories["teams"][codes].tolist())
+    # Category code -> simulation team index
+    index = np.full(len(features.categories["teams"]), -1)
+    index[codes] = np.arange(len(codes))
+
+    completed = features.target != -1
+    home_done = index[home[completed]]
+    away_done = index[away[completed]]
+    home_won = features.target[completed] == 1
+    base_wins = (
+        np.bincount(home_done, weights=home_won, minlength=len(teams))
+        + np.bincount(away_done, weights=~home_won, minlength=len(teams))
+    ).astype(np.int32)
+
+    home_idx = index[upcoming.codes["home_team"]]
+    away_idx = index[upcoming.codes["away_team"]]
+    return teams, base_wins, home_idx, away_idx
+
+
+def simulate_chunks(base_wins, home_idx, away_idx, home_probs, n_sims, rng, chunk_size=None):
+    """
+    Yield (wins, ranks) arrays of shape (chunk, n_teams) until n_sims seasons
+    have been simulated. Each chunk draws a (chunk x n_games) outcome matrix,
+    adds wins per team with one matrix product and ranks teams by wins.
+    """
+    n_teams = len(base_wins)
+    n_games = len(home_idx)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_DRAWS // max(n_games, 1))
+
+    # Every upcoming game is a win for the away team unless the home team wins it
+    home_onehot = np.zeros((n_games, n_teams), dtype=np.float32)
+    home_onehot[np.arange(n_games), home_idx] = 1
+    away_onehot = np.zeros((n_games, n_teams), dtype=np.float32)
+    away_onehot[np.arange(n_games), away_idx] = 1
+    swing = home_onehot - away_onehot
+    start_wins = base_wins + away_onehot.sum(axis=0).astype(np.int32)
+
+    probs = np.asarray(home_probs, dtype=np.float64)
+    positions = np.arange(1, n_teams + 1, dtype=np.int16)
+
+    done = 0
+    while done < n_sims:
+        size = min(chunk_size, n_sims - done)
+        home_wins = (rng.random((size, n_games)) < probs).astype(np.float32)
+        wins = start_wins + (home_wins @ swing).astype(np.int32)
+
+        # Rank 1 = most wins; ties keep team order
+        order = np.argsort(-wins, axis=1, kind="stable")
+        ranks = np.empty_like(order, dtype=np.int16)
+        np.put_along_axis(ranks, order, positions[np.newaxis, :], axis=1)
+
+        yield wins, ranks
+        done += size
+
+
+class SeasonAggregate:
+    """
+    Running totals over simulated seasons: a win-total histogram and rank
+    distribution per team, plus division, wild-card and playoff counts.
+    Memory depends on the number of teams, not the number of simulations.
+    """
+
+    def __init__(self, n_teams, max_wins):
+        self.n_sims = 0
+        self.win_hist = np.zeros((n_teams, max_wins + 1), dtype=np.int64)
+        self.rank_hist = np.zeros((n_teams, n_teams), dtype=np.int64)
+        self.division = np.zeros(n_teams, dtype=np.int64)
+        self.wildcard = np.zeros(n_teams, dtype=np.int64)
+
+    def add(self, wins, ranks, division_winner, wildcard):
+        size, n_teams = wins.shape
+        team = np.arange(n_teams)
+        n_bins = self.win_hist.shape[1]
+        self.win_hist += np.bincount(
+            (team * n_bins + wins).ravel(), minlength=n_teams * n_bins
+        ).reshape(n_teams, n_bins)
+        self.rank_hist += np.bincount(
+            (team * n_teams + ranks - 1).ravel(), minlength=n_teams * n_teams
+        ).reshape(n_teams, n_teams)
+        self.division += division_winner.sum(axis=0)
+        self.wildcard += wildcard.sum(axis=0)
+        self.n_sims += size
+
+    def merge(self, other):
+        self.win_hist += other.win_hist
+        self.rank_hist += other.rank_hist
+        self.division += other.division
+        self.wildcard += other.wildcard
+        self.n_sims += other.n_sims
+        return self
+
+    def mean_wins(self):
+        return self.win_hist @ np.arange(self.win_hist.shape[1]) / self.n_sims
+
+    def mean_rank(self):
+        return self.rank_hist @ np.arange(1, self.rank_hist.shape[1] + 1) / self.n_sims
+
+
+def playoff_spots(wins, division_idx, league_idx, n_wild_cards, rng):
+    """
+    Boolean (sims x teams) arrays of division winners and wild cards. Ties on
+    wins are broken at random. Teams with a negative division index never
+    qualify.
+    """
+    # Fractional noise only reorders teams with equal wins
+    key = wins + rng.random(wins.shape) * 0.5
+    division_winner = np.zeros(wins.shape, dtype=bool)
+    for division in np.unique(division_idx[division_idx >= 0]):
+        members = np.flatnonzero(division_idx == division)
+        best = members[np.argmax(key[:, members], axis=1)]
+        division_winner[np.arange(len(wins)), best] = True
+
+    wildcard = np.zeros(wins.shape, dtype=bool)
+    for league in np.unique(league_idx[league_idx >= 0]):
+        members = np.flatnonzero(league_idx == league)
+        candidates = np.where(division_winner[:, members], -np.inf, key[:, members])
+        top = np.argsort(-candidates, axis=1)[:, :n_wild_cards]
+        wildcard[np.arange(len(wins))[:, np.newaxis], members[top]] = True
+    return division_winner, wildcard
+
+
+def run_shard(base_wins, home_idx, away_idx, home_probs, division_idx, league_idx, n_wild_cards, n_sims, seed, chunk_size=None):
+    """Simulate one shard with its own RNG stream and return its SeasonAggregate."""
+    rng = np.random.default_rng(seed)
+    max_wins = int((base_wins + np.bincount(home_idx, minlength=len(base_wins))
+                    + np.bincount(away_idx, minlength=len(base_wins))).max())
+    aggregate = SeasonAggregate(len(base_wins), max_wins)
+    for wins, ranks in simulate_chunks(base_wins, home_idx, away_idx, home_probs, n_sims, rng, chunk_size):
+        division_winner, wildcard = playoff_spots(wins, division_idx, league_idx, n_wild_cards, rng)
+        aggregate.add(wins, ranks, division_winner, wildcard)
+    return aggregate
+
+
+def simulate_aggregate(base_wins, home_idx, away_idx, home_probs, division_idx, league_idx, n_wild_cards,
+                       n_sims, seed=None, shards=16, processes=1, chunk_size=None):
+    """
+    Simulate n_sims seasons split into shards with independent RNG streams
+    spawned from `seed`, running up to `processes` shards at a time, and
+    merge their aggregates. Results depend on seed and shards, not on the
+    number of processes.
+    """
+    shards = max(1, min(shards, n_sims))
+    sizes = [n_sims // shards + (1 if i < n_sims % shards else 0) for i in range(shards)]
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    jobs = [
+        (base_wins, home_idx, away_idx, home_probs, division_idx, league_idx, n_wild_cards, size, shard_seed, chunk_size)
+        for size, shard_seed in zip(sizes, seeds)
+    ]
+
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = pool.map(run_shard, *zip(*jobs))
+            total = None
+            for aggregate in results:
+                total = aggregate if total is None else total.merge(aggregate)
+        return total
+
+    total = None
+    for job in jobs:
+        aggregate = run_shard(*job)
+        total = aggregate if total is None else total.merge(aggregate)
+    return total
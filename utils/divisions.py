@@ -0,0 +1,25 @@
+# League and division of every club, using the team names in the as-played schedule
+DIVISIONS = {
+    "AL East": ["Baltimore Orioles", "Boston Red Sox", "New York Yankees", "Tampa Bay Rays", "Toronto Blue Jays"],
+    "AL Central": ["Chicago White Sox", "Cleveland Guardians", "Detroit Tigers", "Kansas City Royals", "Minnesota Twins"],
+    "AL West": ["Athletics", "Houston Astros", "Los Angeles Angels", "Seattle Mariners", "Texas Rangers"],
+    "NL East": ["Atlanta Braves", "Miami Marlins", "New York Mets", "Philadelphia Phillies", "Washington Nationals"],
+    "NL Central": ["Chicago Cubs", "Cincinnati Reds", "Milwaukee Brewers", "Pittsburgh Pirates", "St. Louis Cardinals"],
+    "NL West": ["Arizona Diamondbacks", "Colorado Rockies", "Los Angeles Dodgers", "San Diego Padres", "San Francisco Giants"],
+}
+
+# Wild-card spots per league, after the three division winners
+WILD_CARDS = 3
+
+
+def team_division(team: str) -> str:
+    # Return the division a team plays in, or None if unknown
+    for division, teams in DIVISIONS.items():
+        if team in teams:
+            return division
+    return None
+
+
+def division_league(division: str) -> str:
+    # "AL East" -> "AL"
+    return division.split()[0]
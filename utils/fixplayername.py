@@ -1,22 +1,18 @@
-import statsapi
-import unicodedata
-
-def strip_accents(text: str) -> str:
-    """Normalize string by removing accents."""
-    return ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
+from features.data_source import ReplayMiss, get_source
+from features.player_index import get_player_index, garbled_key, strip_accents
+from utils.instrumentation import metrics
 
 # Cache dictionary to reduce API calls
 fixed_names_cache = {}
 
-def fix_player_name(team_name, player_name):
+def fix_player_name(team_name, player_name, season="2025"):
     """
-    Fix pitcher names that contain � by looking up the correct name
-    from the team roster. Uses a cache to avoid repeated API calls.
+    Fix pitcher names that contain � by looking up the correct name in the
+    season's player index, falling back to the team roster when there is no
+    index. Uses a cache to avoid repeated lookups.
     """
     # If already fixed, return cached result
+    metrics.cache("fixed_names", player_name in fixed_names_cache)
     if player_name in fixed_names_cache:
         return fixed_names_cache[player_name]
 
@@ -25,7 +21,16 @@ def fix_player_name(team_name, player_name):
         fixed_names_cache[player_name] = player_name
         return player_name
 
+    index = get_player_index(season)
+    if index is not None:
+        player = index.find(player_name, team_name)
+        metrics.cache("player_index", player is not None)
+        fixed_names_cache[player_name] = player["name"] if player is not None else player_name
+        return fixed_names_cache[player_name]
+
     try:
+        statsapi = get_source()
+
         # Get team ID
         team_id = statsapi.lookup_team(team_name)[0]["id"]
 
@@ -33,8 +38,9 @@ def fix_player_name(team_name, player_name):
         roster = statsapi.roster(team_id, rosterType="pitching")
 
         # Try to find match
+        key = garbled_key(player_name)
         for player in roster:
-            if player_name.replace("�", "").lower() in player["person"]["fullName"].lower().replace("é", "e").replace("í", "i").replace("ó", "o").replace("á", "a"):
+            if garbled_key(player["person"]["fullName"]) == key:
                 fixed_names_cache[player_name] = player["person"]["fullName"]
                 return player["person"]["fullName"]
 
@@ -42,6 +48,8 @@ def fix_player_name(team_name, player_name):
         fixed_names_cache[player_name] = player_name
         return player_name
 
+    except ReplayMiss:
+        raise
     except Exception as e:
         print(f"Error fixing name {player_name}: {e}")
         fixed_names_cache[player_name] = player_name
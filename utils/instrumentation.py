@@ -0,0 +1,177 @@
+"""
+Run metrics shared by every stage of the pipeline: wall/CPU time and rows
+per stage, counters, cache hits and misses, and latency histograms.
+Standard library only, so mlb.py can import it before any script runs.
+
+    from utils.instrumentation import metrics
+
+    with metrics.stage("build_features") as stage:
+        df = build(...)
+        stage.rows = len(df)
+    metrics.cache("pitcher_store", hit=True)
+    metrics.observe("statsapi.lookup_player", seconds)
+
+Set MLB_METRICS_REPORT=<path> (or pass --report to mlb.py) to have the
+report written as JSON when the process exits.
+"""
+import atexit
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+REPORT_ENV = "MLB_METRICS_REPORT"
+
+# Upper bounds (seconds) of the latency histogram buckets; the last is open
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class _Stage:
+    def __init__(self):
+        self.rows = None
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.wall_start = time.perf_counter()
+            self.cpu_start = time.process_time()
+            self.stages = {}
+            self.counters = {}
+            self.caches = {}
+            self.latencies = {}
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Time a block (wall clock and process CPU). Set `.rows` on the
+        yielded object, or pass rows=, to get rows per second. Repeated
+        stages with the same name add up.
+        """
+        handle = _Stage()
+        handle.rows = rows
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield handle
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            with self.lock:
+                entry = self.stages.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "rows": 0})
+                entry["calls"] += 1
+                entry["wall_seconds"] += wall
+                entry["cpu_seconds"] += cpu
+                entry["rows"] += handle.rows or 0
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def cache(self, name, hit, n=1):
+        """Record n hits (hit=True) or misses on the named cache."""
+        with self.lock:
+            entry = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            entry["hits" if hit else "misses"] += n
+
+    def observe(self, name, seconds):
+        """Add one latency sample to the named histogram."""
+        with self.lock:
+            entry = self.latencies.setdefault(
+                name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)}
+            )
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["buckets"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    @contextmanager
+    def timed(self, name):
+        """Observe how long a block takes, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def report(self):
+        with self.lock:
+            stages = {
+                name: dict(entry, rows_per_second=entry["rows"] / entry["wall_seconds"] if entry["rows"] and entry["wall_seconds"] else None)
+                for name, entry in self.stages.items()
+            }
+            caches = {
+                name: dict(entry, hit_ratio=entry["hits"] / (entry["hits"] + entry["misses"]) if entry["hits"] + entry["misses"] else None)
+                for name, entry in self.caches.items()
+            }
+            labels = [f"<={bound * 1000:g}ms" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1] * 1000:g}ms"]
+            latencies = {
+                name: {
+                    "count": entry["count"],
+                    "mean_seconds": entry["total_seconds"] / entry["count"],
+                    "max_seconds": entry["max_seconds"],
+                    "total_seconds": entry["total_seconds"],
+                    "histogram": dict(zip(labels, entry["buckets"])),
+                }
+                for name, entry in self.latencies.items()
+            }
+            return {
+                "argv": sys.argv,
+                "started_at": self.started,
+                "wall_seconds": time.perf_counter() - self.wall_start,
+                "cpu_seconds": time.process_time() - self.cpu_start,
+                "stages": stages,
+                "counters": dict(self.counters),
+                "caches": caches,
+                "latencies": latencies,
+            }
+
+    def write_report(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def print_summary(self, file=sys.stderr):
+        report = self.report()
+        print(f"\nRun: {report['wall_seconds']:.2f} s wall, {report['cpu_seconds']:.2f} s CPU", file=file)
+        for name, entry in report["stages"].items():
+            rate = f", {entry['rows_per_second']:,.0f} rows/s" if entry["rows_per_second"] else ""
+            print(f"  {name:28} {entry['wall_seconds']:8.3f} s wall {entry['cpu_seconds']:8.3f} s CPU{rate}", file=file)
+        for name, entry in report["caches"].items():
+            ratio = "-" if entry["hit_ratio"] is None else f"{entry['hit_ratio']:.1%}"
+            print(f"  cache {name:22} {entry['hits']} hits, {entry['misses']} misses ({ratio})", file=file)
+        for name, entry in report["latencies"].items():
+            print(f"  calls {name:22} {entry['count']} x {entry['mean_seconds'] * 1000:.1f} ms mean, {entry['max_seconds'] * 1000:.1f} ms max", file=file)
+        for name, value in report["counters"].items():
+            print(f"  count {name:22} {value}", file=file)
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def profiled(path):
+    """Run a block under cProfile and dump the stats to path (if path is set)."""
+    if not path:
+        yield
+        return
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+if os.environ.get(REPORT_ENV):
+    atexit.register(lambda: metrics.write_report(os.environ[REPORT_ENV]))
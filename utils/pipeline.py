@@ -0,0 +1,262 @@
+"""
+Content-hash pipeline runner. Each stage is a script run in its own
+process, from the repo root like every script here. Its key is a hash of
+its arguments, its code and the contents of its input files (and selected
+database tables). A stage whose key matches the last successful run and
+whose outputs exist is skipped. Stages run as soon as the stages they
+come after have finished, several at a time.
+
+Outputs passed to a script through a flag are written to a staging
+directory and moved into place (os.replace) only when the stage succeeds,
+so a failed or killed run never leaves a half-written artifact.
+Standard library only.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.instrumentation import metrics
+
+STATE_FILE = "data/pipeline_state.json"
+MISSING = "missing"
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    script      path of the script to run, relative to the repo root
+    args        its arguments
+    inputs      files whose contents the result depends on (may be missing)
+    databases   {sqlite path: [queries]} whose results the stage depends on
+    code        glob patterns of the source files it runs
+    outputs     files it writes itself (must exist for a skip)
+    staged      {flag: path} outputs the runner passes as `flag <staging path>`
+    siblings    other files the script writes next to a staged output
+    carry       copy existing staged outputs in first (incremental stages)
+    updates     inputs the stage itself modifies; hashed again after it runs
+    after       names of the stages that must finish first
+    """
+
+    def __init__(self, name, script, args=(), inputs=(), databases=None, code=(), outputs=(),
+                 staged=None, siblings=(), carry=False, updates=(), after=()):
+        self.name = name
+        self.script = script
+        self.args = [str(arg) for arg in args]
+        self.inputs = list(inputs)
+        self.databases = databases or {}
+        self.code = list(code)
+        self.outputs = list(outputs)
+        self.staged = staged or {}
+        self.siblings = list(siblings)
+        self.carry = carry
+        self.updates = set(updates)
+        self.after = list(after)
+
+    def staging_path(self, path):
+        return os.path.join(os.path.dirname(path), ".staging", self.name, os.path.basename(path))
+
+
+class StageFailed(RuntimeError):
+    pass
+
+
+class Pipeline:
+    def __init__(self, stages, state_path=STATE_FILE, jobs=4, force=(), dry_run=False):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            unknown = set(stage.after) - set(self.stages)
+            if unknown:
+                raise ValueError(f"{stage.name} comes after unknown stages {sorted(unknown)}")
+        self.state_path = state_path
+        self.jobs = jobs
+        self.force = set(self.stages) if "all" in force else set(force)
+        self.dry_run = dry_run
+        self.lock = threading.Lock()
+        self.state = self.load_state()
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        return {"stages": {}, "files": {}}
+
+    def save_state(self):
+        with self.lock:
+            text = json.dumps(self.state, indent=1, sort_keys=True)
+        tmp_path = self.state_path + ".tmp"
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, self.state_path)
+
+    def file_digest(self, path):
+        """SHA-256 of a file, reused while its size and mtime are unchanged."""
+        if not os.path.exists(path):
+            return MISSING
+        info = os.stat(path)
+        stamp = [info.st_size, info.st_mtime_ns]
+        with self.lock:
+            known = self.state["files"].get(path)
+        if known is not None and known[:2] == stamp:
+            metrics.cache("pipeline_digests", True)
+            return known[2]
+        metrics.cache("pipeline_digests", False)
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self.lock:
+            self.state["files"][path] = stamp + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    @staticmethod
+    def database_digest(path, queries):
+        """SHA-256 of query results, so bookkeeping columns (fetch times) can be left out."""
+        if not os.path.exists(path):
+            return MISSING
+        digest = hashlib.sha256()
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+        try:
+            for query in queries:
+                digest.update(query.encode())
+                try:
+                    for row in conn.execute(query):
+                        digest.update(repr(row).encode())
+                except sqlite3.OperationalError:
+                    # Table not created yet
+                    digest.update(MISSING.encode())
+        finally:
+            conn.close()
+        return digest.hexdigest()
+
+    def key_parts(self, stage, only=None):
+        parts = {"script": stage.script, "args": stage.args}
+        parts["inputs"] = {path: self.file_digest(path) for path in stage.inputs if only is None or path in only}
+        parts["databases"] = {
+            path: self.database_digest(path, queries)
+            for path, queries in stage.databases.items() if only is None or path in only
+        }
+        if only is None:
+            code = sorted({path for pattern in stage.code for path in glob.glob(pattern, recursive=True)})
+            parts["code"] = {path: self.file_digest(path) for path in code}
+        return parts
+
+    @staticmethod
+    def key(parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def up_to_date(self, stage, key):
+        last = self.state["stages"].get(stage.name, {})
+        return (
+            stage.name not in self.force
+            and last.get("key") == key
+            and all(os.path.exists(path) for path in stage.outputs + list(stage.staged.values()))
+        )
+
+    def run_stage(self, stage):
+        """Run a stage's script, then move its staged outputs into place."""
+        command = [sys.executable, stage.script] + stage.args
+        staged = {path: stage.staging_path(path) for path in list(stage.staged.values()) + stage.siblings}
+        for path, staging in staged.items():
+            os.makedirs(os.path.dirname(staging), exist_ok=True)
+            if os.path.exists(staging):
+                os.remove(staging)
+            if stage.carry and os.path.exists(path):
+                shutil.copy2(path, staging)
+        for flag, path in stage.staged.items():
+            command += [flag, staged[path]]
+
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        output = "".join(f"  [{stage.name}] {line}\n" for line in result.stdout.splitlines())
+        if result.returncode != 0:
+            raise StageFailed(f"{stage.name} exited with {result.returncode}:\n{output}")
+
+        missing = [path for path in stage.staged.values() if not os.path.exists(staged[path])]
+        if missing:
+            raise StageFailed(f"{stage.name} did not write {', '.join(missing)}:\n{output}")
+        # Staged outputs first, in order, then the files written next to them
+        for path in list(stage.staged.values()) + stage.siblings:
+            if os.path.exists(staged[path]):
+                os.replace(staged[path], path)
+        for directory in {os.path.dirname(staging) for staging in staged.values()}:
+            shutil.rmtree(directory, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(directory))
+            except OSError:
+                pass  # another stage is still staging there
+        return output
+
+    def execute(self, name):
+        stage = self.stages[name]
+        parts = self.key_parts(stage)
+        key = self.key(parts)
+        if self.up_to_date(stage, key):
+            metrics.count("pipeline_skipped")
+            return "skipped", "", 0.0
+        if self.dry_run:
+            return "would run", "", 0.0
+
+        start = time.perf_counter()
+        with metrics.stage(f"pipeline.{name}"):
+            output = self.run_stage(stage)
+        seconds = time.perf_counter() - start
+
+        if stage.updates:
+            # Record what the stage left behind in the inputs it fills itself
+            updated = self.key_parts(stage, stage.updates)
+            parts["inputs"].update(updated["inputs"])
+            parts["databases"].update(updated["databases"])
+            key = self.key(parts)
+        with self.lock:
+            self.state["stages"][name] = {"key": key, "finished_at": time.time(), "seconds": seconds}
+        self.save_state()
+        return "done", output, seconds
+
+    def run(self, log=print):
+        """Run every stage that is out of date. Returns {stage name: status}."""
+        status = {}
+        pending = dict(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                waiting = len(pending)
+                for name, stage in list(pending.items()):
+                    if any(status.get(dep) in ("failed", "blocked") for dep in stage.after):
+                        status[name] = "blocked"
+                        log(f"{name}: blocked by a failed stage")
+                        del pending[name]
+                    elif self.dry_run and any(status.get(dep) == "would run" for dep in stage.after):
+                        status[name] = "would run"
+                        log(f"{name}: would run")
+                        del pending[name]
+                    elif all(dep in status for dep in stage.after):
+                        running[pool.submit(self.execute, name)] = name
+                        del pending[name]
+                if not running:
+                    if len(pending) == waiting:
+                        raise ValueError(f"Stages {sorted(pending)} wait on each other")
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status[name], output, seconds = future.result()
+                    except Exception as e:
+                        status[name] = "failed"
+                        log(f"{name}: failed\n{e}")
+                        continue
+                    if output:
+                        log(output.rstrip("\n"))
+                    log(f"{name}: {status[name]}" + (f" in {seconds:.1f} s" if status[name] == "done" else ""))
+        self.save_state()
+        return status
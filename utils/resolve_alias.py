@@ -18,7 +18,7 @@ TEAM_NAME_MAP = {
     "twins": "Minnesota Twins",
     "yankees": "New York Yankees",
     "mets": "New York Mets",
-    "athletics": "Oakland Athletics",
+    "athletics": "Athletics",
     "phillies": "Philadelphia Phillies",
     "pirates": "Pittsburgh Pirates",
     "padres": "San Diego Padres",